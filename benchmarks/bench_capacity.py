@@ -0,0 +1,31 @@
+import sys
+import time
+
+from topology import make_options
+from vpc_cli.capacity import CapacityPlan, load_numpy
+
+
+def main():
+    # vpcs of 10 subnets each, with and without numpy
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    backends = [True, False] if load_numpy() else [False]
+
+    print(f'{"vpcs":>8} {"subnets":>8} {"numpy":>6} {"best (ms)":>10}')
+
+    for count in counts:
+        vpcs = [make_options(10, 1) for _ in range(count)]
+
+        for use_numpy in backends:
+            best = None
+
+            for _ in range(5):
+                start = time.perf_counter()
+                CapacityPlan(vpcs, use_numpy)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            print(f'{count:>8} {count * 10:>8} {str(use_numpy):>6} {best * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import sys
+import time
+
+from topology import make_options
+from vpc_cli.check import check_template
+from vpc_cli.create_yaml import CreateYAML
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [6, 30, 300]
+
+    print(f'{"subnets":>8} {"resources":>10} {"templates/s":>12}')
+
+    for count in counts:
+        template = CreateYAML(**make_options(count), output=None).get_template()
+        assert not check_template(template, 'us-east-1')
+        runs = 0
+        start = time.perf_counter()
+
+        while time.perf_counter() - start < 1:
+            check_template(template, 'us-east-1')
+            runs += 1
+
+        print(f'{count:>8} {len(template["Resources"]):>10} {runs / (time.perf_counter() - start):>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
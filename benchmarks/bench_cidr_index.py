@@ -0,0 +1,55 @@
+import random
+import sys
+import time
+
+from vpc_cli.cidr_index import CidrIndex
+from vpc_cli.tools import cidr_overlapped
+from vpc_cli.validators import subnet_cidr_validator
+
+VPC_CIDR = '10.0.0.0/14'
+
+
+def make_prefixes(count, seed=0):
+    # count /28 blocks inside VPC_CIDR in random order
+    prefixes = [f'10.{i >> 12 & 0x3}.{i >> 4 & 0xff}.{(i & 0xf) << 4}/28' for i in range(count)]
+    random.Random(seed).shuffle(prefixes)
+
+    return prefixes
+
+
+def bench_linear(prefixes):
+    accepted = []
+    start = time.perf_counter()
+
+    for prefix in prefixes:
+        if cidr_overlapped(VPC_CIDR, prefix) and not any(cidr_overlapped(cidr, prefix) for cidr in accepted):
+            accepted.append(prefix)
+
+    return time.perf_counter() - start
+
+
+def bench_index(prefixes):
+    index = CidrIndex()
+    start = time.perf_counter()
+
+    for prefix in prefixes:
+        if subnet_cidr_validator(prefix, VPC_CIDR, index):
+            index.add(prefix)
+
+    return time.perf_counter() - start
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 2000, 10000, 16384]
+
+    print(f'{"prefixes":>10} {"linear (s)":>12} {"index (s)":>12}')
+
+    for count in counts:
+        prefixes = make_prefixes(count)
+        # the pairwise loop is quadratic, skip it where it would take minutes
+        linear = f'{bench_linear(prefixes):12.4f}' if count <= 2000 else f'{"-":>12}'
+        print(f'{count:>10} {linear} {bench_index(prefixes):12.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import sys
+import time
+
+from vpc_cli.conflicts import find_conflicts
+from vpc_cli.tools import cidr_overlapped
+
+
+def make_blocks(count):
+    # /24 vpcs in 10.0.0.0/8, every 100th is a duplicate of the previous one
+    return [(f'vpc-{i}', f'10.{(i - (i % 100 == 99)) // 256 % 256}.{(i - (i % 100 == 99)) % 256}.0/24')
+            for i in range(count)]
+
+
+def pairwise(blocks):
+    return [(a, b) for i, a in enumerate(blocks) for b in blocks[:i] if cidr_overlapped(a[1], b[1])]
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 50000]
+
+    print(f'{"vpcs":>8} {"conflicts":>10} {"sweep (ms)":>11} {"pairwise (ms)":>14}')
+
+    for count in counts:
+        blocks = make_blocks(count)
+        start = time.perf_counter()
+        conflicts = len(list(find_conflicts(blocks)))
+        sweep = time.perf_counter() - start
+
+        # pairwise loop is quadratic, only measured for small fleets
+        if count <= 5000:
+            start = time.perf_counter()
+            pairwise(blocks)
+            pairwise_time = f'{(time.perf_counter() - start) * 1000:>14.1f}'
+
+        else:
+            pairwise_time = f'{"-":>14}'
+
+        print(f'{count:>8} {conflicts:>10} {sweep * 1000:>11.1f} {pairwise_time}')
+
+
+if __name__ == '__main__':
+    main()
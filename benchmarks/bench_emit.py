@@ -0,0 +1,43 @@
+import io
+import sys
+import time
+
+import yaml
+
+from topology import make_options
+from vpc_cli.create_yaml import CreateYAML, dump_template
+
+# pure python Dumper as the baseline, dump_template uses CDumper when libyaml is installed
+EMITTERS = {
+    'yaml (Dumper)': lambda template, f: yaml.dump(template, f, Dumper=yaml.Dumper),
+    'dump_template yaml': lambda template, f: dump_template(template, f, 'yaml'),
+    'dump_template json': lambda template, f: dump_template(template, f, 'json'),
+}
+
+
+def best_of(func, repeat=3):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]
+
+    print(f'{"subnets":>8} {"resources":>10} ' + ' '.join(f'{name:>19}' for name in EMITTERS))
+
+    for count in counts:
+        # built without output, nothing is written and building is not timed
+        template = CreateYAML(**make_options(count), output=None).get_template()
+        timings = [best_of(lambda: emit(template, io.StringIO())) for emit in EMITTERS.values()]
+
+        print(f'{count:>8} {len(template["Resources"]):>10} ' + ' '.join(f'{t:>18.4f}s' for t in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+import re
+import subprocess
+import sys
+
+# module: (statement, budget in ms of cumulative import time)
+CHECKS = {
+    'vpc_cli.main': ('import vpc_cli.main', 20),
+    'generate': ('import vpc_cli.main, vpc_cli.spec, vpc_cli.create_yaml', 80),
+}
+# must not be loaded before a command needs them
+HEAVY_MODULES = ['boto3', 'botocore', 'inquirer', 'blessed', 'prettytable', 'pyfiglet']
+
+
+def import_times(statement):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, check=True, cwd=root
+    )
+    times = {}
+
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)', line)
+
+        if match:
+            times[match.group(4)] = int(match.group(2)) / 1000
+
+    return times
+
+
+def main():
+    failed = False
+
+    for name, (statement, budget) in CHECKS.items():
+        times = import_times(statement)
+        modules = [module.strip() for module in statement.replace('import ', '').split(',')]
+        total = sum(times.get(module, 0) for module in modules)
+        heavy = sorted({module.split('.')[0] for module in times} & set(HEAVY_MODULES))
+        status = 'ok' if total <= budget and not heavy else 'FAIL'
+        failed = failed or status == 'FAIL'
+
+        print(f'{name:<16} {total:8.1f} ms (budget {budget} ms) {status}' + (f' heavy: {", ".join(heavy)}' if heavy else ''))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
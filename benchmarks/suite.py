@@ -0,0 +1,220 @@
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from contextlib import redirect_stdout
+
+from topology import make_options
+from vpc_cli import VERSION
+from vpc_cli.cidr_index import CidrIndex
+from vpc_cli.create_yaml import CreateYAML, dump_template
+from vpc_cli.print_table import PrintTable
+from vpc_cli.tools import cidr_overlapped, cidr_range
+from vpc_cli.validators import subnet_cidr_validator
+
+SUBNETS = [1, 10, 100, 1000]
+ROUTE_TABLES = [1, 10, 100]
+QUICK_SUBNETS = [1, 10, 100]
+REGRESSION_THRESHOLD = 1.2
+REGRESSION_MIN_DELTA = 0.001  # seconds, sub millisecond cases are mostly noise
+
+
+def all_subnets(options):
+    return options['public_subnet'] + options['private_subnet'] + options['protected_subnet']
+
+
+def bench_build(options, tmp):
+    CreateYAML(**options, output=None).get_template()
+
+
+def build_template(options):
+    return CreateYAML(**options, output=None).get_template()
+
+
+def bench_emit(template, tmp):
+    # emitter only, the template is built by SETUP outside the timer
+    dump_template(template, io.StringIO())
+
+
+def bench_validate(options, tmp):
+    # same calls as the interactive prompts, one validation per subnet
+    index = CidrIndex()
+
+    for subnet in all_subnets(options):
+        if subnet_cidr_validator(subnet['cidr'], options['vpc']['cidr'], index):
+            index.add(subnet['cidr'])
+
+
+def bench_overlapped(options, tmp):
+    cidrs = [subnet['cidr'] for subnet in all_subnets(options)]
+
+    for i, cidr in enumerate(cidrs):
+        for other in cidrs[:i]:
+            cidr_overlapped(cidr, other)
+
+
+def bench_print_subnets(options, tmp):
+    with redirect_stdout(io.StringIO()):
+        PrintTable().print_subnets(
+            public_subnet=options['public_subnet'],
+            private_subnet=options['private_subnet'],
+            protected_subnet=options['protected_subnet'],
+            public_rtb=options['public_rtb'],
+            private_rtb=options['private_rtb'],
+            protected_rtb=options['protected_rtb']
+        )
+
+
+def bench_print_subnets_ndjson(options, tmp):
+    # streamed rows, no table is buffered
+    PrintTable('ndjson', io.StringIO()).print_subnets(
+        public_subnet=options['public_subnet'],
+        private_subnet=options['private_subnet'],
+        protected_subnet=options['protected_subnet'],
+        public_rtb=options['public_rtb'],
+        private_rtb=options['private_rtb'],
+        protected_rtb=options['protected_rtb']
+    )
+
+
+# name: (function, whether route table count changes the result)
+BENCHMARKS = {
+    'build': (bench_build, True),
+    'emit': (bench_emit, True),
+    'validate': (bench_validate, False),
+    'overlapped': (bench_overlapped, False),
+    'print_subnets': (bench_print_subnets, True),
+    'print_subnets_ndjson': (bench_print_subnets_ndjson, True),
+}
+
+# name: function which prepares the benchmark argument from options, not measured
+SETUP = {
+    'emit': build_template,
+}
+
+
+def measure(func, options, tmp, repeat):
+    timings = []
+    func(options, tmp)  # warm up, lazy imports and first allocations are not measured
+
+    for _ in range(repeat):
+        cidr_range.cache_clear()  # every run parses cidrs like a fresh process
+        start = time.perf_counter()
+        func(options, tmp)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings), sum(timings) / len(timings)
+
+
+def run(names, subnet_counts, route_table_counts, repeat):
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            func, uses_route_tables = BENCHMARKS[name]
+
+            for subnets in subnet_counts:
+                for route_tables in route_table_counts if uses_route_tables else route_table_counts[:1]:
+                    options = make_options(subnets, route_tables)
+
+                    if name in SETUP:
+                        options = SETUP[name](options)
+
+                    best, mean = measure(func, options, tmp, repeat)
+                    result = {
+                        'name': name,
+                        'subnets': subnets,
+                        'route_tables': route_tables if uses_route_tables else None,
+                        'best': best,
+                        'mean': mean,
+                        'repeat': repeat,
+                    }
+                    results.append(result)
+                    print(format_result(result), file=sys.stderr)
+
+    return results
+
+
+def result_key(result):
+    return result['name'], result['subnets'], result['route_tables']
+
+
+def format_result(result, baseline=None):
+    route_tables = '-' if result['route_tables'] is None else result['route_tables']
+    line = f'{result["name"]:<20} {result["subnets"]:>7} {route_tables:>7} {result["best"] * 1000:>11.3f}ms'
+
+    if baseline:
+        ratio = result['best'] / baseline['best'] if baseline['best'] else float('inf')
+        line += f' {baseline["best"] * 1000:>11.3f}ms {ratio:>7.2f}x'
+
+    return line
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    # prints every case against the baseline, returns number of regressions
+    baseline = {result_key(result): result for result in baseline['results']}
+    regressions = 0
+
+    print(f'{"benchmark":<20} {"subnets":>7} {"rtbs":>7} {"current":>13} {"baseline":>13} {"ratio":>8}')
+
+    for result in results:
+        base = baseline.get(result_key(result))
+        line = format_result(result, base)
+
+        if base and base['best'] and result['best'] / base['best'] > threshold and \
+                result['best'] - base['best'] > REGRESSION_MIN_DELTA:
+            line += '  REGRESSION'
+            regressions += 1
+
+        print(line)
+
+    return regressions
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='vpc-cli benchmark suite')
+    parser.add_argument('-b', '--benchmark', dest='benchmarks', action='append', choices=list(BENCHMARKS),
+                        help='benchmark to run, can be repeated. (default: all)')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=5,
+                        help='runs per case, the best run is compared. (default: 5)')
+    parser.add_argument('-q', '--quick', dest='quick', action='store_true',
+                        help=f'only up to {QUICK_SUBNETS[-1]} subnets.')
+    parser.add_argument('-o', '--output', dest='output', default=None,
+                        help='write results as json, e.g. to save a baseline.')
+    parser.add_argument('-c', '--compare', dest='compare', default=None,
+                        help='baseline json to compare with, exits 1 on regression.')
+    parser.add_argument('-t', '--threshold', dest='threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f'slowdown ratio reported as regression. (default: {REGRESSION_THRESHOLD})')
+
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    names = args.benchmarks or list(BENCHMARKS)
+    results = run(names, QUICK_SUBNETS if args.quick else SUBNETS, ROUTE_TABLES, args.repeat)
+    report = {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+from vpc_cli.tools import get_azs
+
+REGION = 'us-east-1'
+
+
+def subnet_cidr(i):
+    # i-th /24 inside 10.0.0.0/8
+    return f'10.{i >> 8 & 0xff}.{i & 0xff}.0/24'
+
+
+def make_options(subnets, route_tables=None):
+    # stable synthetic topology with CreateYAML keyword arguments,
+    # private subnets get their own route table and nat gateway like the interactive flow
+    azs = get_azs(REGION)
+    route_tables = route_tables or max(3, subnets // 3)
+    private = max(0, min(route_tables - 2, subnets - 2))
+    public = max(1, (subnets - private) // 2)
+    protected = subnets - private - public
+    counter = iter(range(subnets))
+
+    def make_subnets(prefix, count):
+        return [
+            {'name': f'{prefix}-{i}', 'cidr': subnet_cidr(next(counter)), 'az': azs[i % len(azs)]}
+            for i in range(count)
+        ]
+
+    public_subnet = make_subnets('public', public)
+    private_subnet = make_subnets('private', private)
+    protected_subnet = make_subnets('protected', protected)
+    nat = [
+        {'name': f'nat-{i}', 'eip': f'eip-{i}', 'subnet': public_subnet[i % len(public_subnet)]['name']}
+        for i in range(private)
+    ]
+    private_rtb = [
+        {'name': f'private-rt-{i}', 'subnet': subnet['name'], 'nat': f'nat-{i}'}
+        for i, subnet in enumerate(private_subnet)
+    ]
+    rtb_names = ['public-rt'] + [d['name'] for d in private_rtb] + (['protected-rt'] if protected else [])
+
+    return {
+        'project': 'bench',
+        'region': REGION,
+        'vpc': {'name': 'bench-vpc', 'cidr': '10.0.0.0/8'},
+        'public_subnet': public_subnet,
+        'private_subnet': private_subnet,
+        'protected_subnet': protected_subnet,
+        'k8s_tags': True,
+        'igw': 'bench-igw',
+        'public_rtb': 'public-rt',
+        'private_rtb': private_rtb,
+        'protected_rtb': 'protected-rt' if protected else None,
+        'nat': nat,
+        's3_gateway_ep': {'route-table': rtb_names},
+        'dynamodb_gateway_ep': {'route-table': rtb_names[:1]},
+        'flow_logs': {'log-group': '/aws/vpc/bench-vpc', 'role-name': 'bench-vpc-flow-logs-role'},
+    }
@@ -2,12 +2,10 @@ from setuptools import setup, find_packages
 
 requires = [
     'ansicon>=1.89.0',
-    'aws-cloudformation-visualizer>=0.0.3',
     'blessed>=1.20.0',
     'boto3>=1.26.81',
     'botocore>=1.29.81',
     'inquirer>=3.1.2',
-    'ipaddr>=2.2.0',
     'jinxed>=1.2.0',
     'jmespath>=1.0.1',
     'prettytable>=3.6.0',
@@ -35,6 +33,10 @@ setup(
         ]
     },
     install_requires=requires,
+    extras_require={
+        'numpy': ['numpy>=1.20'],  # vectorized capacity planner
+        'test': ['pytest>=7'],
+    },
     # packages=find_packages(),
     python_requires='>=3.8',
     url='https://github.com/marcus16-kang/vpc-stack-generator-cli',
@@ -0,0 +1,82 @@
+import pytest
+
+from vpc_cli.allocator import SubnetAllocator, hosts_to_prefix, subnet_prefix
+from vpc_cli.cidr_index import CidrIndex
+
+
+def test_allocate_packs_from_lowest_address():
+    allocator = SubnetAllocator('10.0.0.0/16')
+
+    assert allocator.allocate(24) == '10.0.0.0/24'
+    assert allocator.allocate(24) == '10.0.1.0/24'
+    assert allocator.allocate(26) == '10.0.2.0/26'
+    assert allocator.allocate(24) == '10.0.3.0/24'
+    assert allocator.allocate(26) == '10.0.2.64/26'
+
+
+def test_allocate_many_keeps_request_order_without_holes():
+    allocator = SubnetAllocator('10.0.0.0/16')
+
+    assert allocator.allocate_many([26, 24, 25]) == ['10.0.1.128/26', '10.0.0.0/24', '10.0.1.0/25']
+    assert allocator.allocate(26) == '10.0.1.192/26'
+
+
+def test_reserved_blocks_are_skipped():
+    allocator = SubnetAllocator('10.0.0.0/16', ['10.0.0.0/24', '10.0.1.0/25'])
+
+    assert allocator.allocate(25) == '10.0.1.128/25'
+    assert allocator.allocate(23) == '10.0.2.0/23'
+    assert allocator.allocate(24) == '10.0.4.0/24'
+
+
+def test_fragmented_vpc_has_no_larger_block():
+    # every other /26 of a /24 is taken, 128 addresses are free but no /25 is
+    allocator = SubnetAllocator('10.0.0.0/24', ['10.0.0.0/26', '10.0.0.128/26'])
+
+    assert allocator.suggest(25) is None
+    assert allocator.allocate(26) == '10.0.0.64/26'
+    assert allocator.allocate(26) == '10.0.0.192/26'
+
+
+def test_exhaustion():
+    allocator = SubnetAllocator('10.0.0.0/24')
+    cidrs = [allocator.allocate(28) for _ in range(16)]
+
+    # every /28 of the vpc exactly once, the index raises on overlaps
+    assert len(CidrIndex(cidrs)) == 16
+
+    with pytest.raises(ValueError):
+        allocator.allocate(28)
+
+
+def test_prefix_larger_than_vpc():
+    allocator = SubnetAllocator('10.0.0.0/24')
+
+    assert allocator.suggest(23) is None
+
+    with pytest.raises(ValueError):
+        allocator.allocate(23)
+
+
+@pytest.mark.parametrize('cidr', ['10.0.0.0/25', '10.0.0.64/26', '10.0.0.0/24', '10.1.0.0/24'])
+def test_reserve_overlapped_or_outside(cidr):
+    allocator = SubnetAllocator('10.0.0.0/24', ['10.0.0.0/25'])
+
+    with pytest.raises(ValueError):
+        allocator.reserve(cidr)
+
+
+@pytest.mark.parametrize('hosts, prefix', [(1, 28), (11, 28), (12, 27), (123, 25), (124, 24), (251, 24)])
+def test_hosts_to_prefix(hosts, prefix):
+    assert hosts_to_prefix(hosts) == prefix
+
+
+@pytest.mark.parametrize('request_, prefix', [(24, 24), ('/20', 20), ({'prefix': 26}, 26), ({'hosts': 200}, 24)])
+def test_subnet_prefix(request_, prefix):
+    assert subnet_prefix(request_) == prefix
+
+
+@pytest.mark.parametrize('request_', [15, 29, {'hosts': 70000}])
+def test_subnet_prefix_out_of_range(request_):
+    with pytest.raises(ValueError):
+        subnet_prefix(request_)
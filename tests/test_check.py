@@ -0,0 +1,137 @@
+import pytest
+import yaml
+
+from vpc_cli.check import TemplateLoader, check_template, find_cycle
+
+REGION = 'ap-northeast-2'
+
+
+def make_template(**resources):
+    template = {
+        'Resources': {
+            'VPC': {'Type': 'AWS::EC2::VPC', 'Properties': {'CidrBlock': '10.0.0.0/16'}},
+            'Subnet': {
+                'Type': 'AWS::EC2::Subnet',
+                'Properties': {
+                    'VpcId': {'Ref': 'VPC'},
+                    'CidrBlock': '10.0.0.0/24',
+                    'AvailabilityZone': 'ap-northeast-2a',
+                },
+            },
+        }
+    }
+    template['Resources'].update(resources)
+
+    return template
+
+
+def route_table(**properties):
+    return {'Type': 'AWS::EC2::RouteTable', 'Properties': dict({'VpcId': {'Ref': 'VPC'}}, **properties)}
+
+
+def test_consistent_template():
+    template = make_template(RouteTable=route_table(), Association={
+        'Type': 'AWS::EC2::SubnetRouteTableAssociation',
+        'Properties': {'SubnetId': {'Ref': 'Subnet'}, 'RouteTableId': {'Fn::GetAtt': ['RouteTable', 'RouteTableId']}},
+    })
+
+    assert check_template(template, REGION) == []
+
+
+@pytest.mark.parametrize('value, error', [
+    ({'Ref': 'Missing'}, 'Ref Missing refers to unknown resource or parameter'),
+    ({'Fn::GetAtt': ['Missing', 'Id']}, 'Fn::GetAtt Missing.Id refers to unknown resource'),
+    ({'Fn::GetAtt': 'Missing.Id'}, 'Fn::GetAtt Missing.Id refers to unknown resource'),
+    ({'Fn::GetAtt': ['VPC']}, 'must be a logical id and an attribute'),
+    ({'Ref': ['VPC']}, 'must be a logical id'),
+])
+def test_dangling_references(value, error):
+    errors = check_template(make_template(RouteTable=route_table(VpcId=value)), REGION)
+
+    assert len(errors) == 1
+    assert errors[0].startswith('RouteTable: ')
+    assert error in errors[0]
+
+
+def test_parameters_and_pseudo_parameters_are_known():
+    tags = [{'Key': 'region', 'Value': {'Ref': 'AWS::Region'}}]
+    template = make_template(RouteTable=route_table(VpcId={'Ref': 'VpcId'}, Tags=tags))
+    template['Parameters'] = {'VpcId': {'Type': 'String'}}
+
+    assert check_template(template, REGION) == []
+
+
+def test_dangling_depends_on():
+    errors = check_template(make_template(RouteTable=dict(route_table(), DependsOn=['Subnet', 'Missing'])), REGION)
+
+    assert errors == ['RouteTable: DependsOn Missing refers to unknown resource']
+
+
+def test_depends_on_cycle():
+    template = make_template(
+        A=dict(route_table(), DependsOn='B'),
+        B=dict(route_table(), DependsOn='C'),
+        C=dict(route_table(), DependsOn='A'),
+    )
+    errors = check_template(template, REGION)
+
+    assert len(errors) == 1
+    assert errors[0].startswith('circular dependency: ')
+
+    cycle = errors[0][len('circular dependency: '):].split(' -> ')
+
+    assert cycle[0] == cycle[-1]
+    assert sorted(cycle[:-1]) == ['A', 'B', 'C']
+
+
+def test_reference_cycle():
+    # cycles through Ref and Fn::GetAtt count as well as DependsOn
+    template = make_template(
+        A=route_table(Tags=[{'Key': 'b', 'Value': {'Ref': 'B'}}]),
+        B=route_table(Tags=[{'Key': 'a', 'Value': {'Fn::GetAtt': ['A', 'RouteTableId']}}]),
+    )
+
+    assert [error for error in check_template(template, REGION) if error.startswith('circular dependency')]
+
+
+def test_find_cycle():
+    assert find_cycle({'a': {'b'}, 'b': {'c'}, 'c': set()}) is None
+    assert find_cycle({'a': {'a'}}) == ['a', 'a']
+    assert find_cycle({'a': {'b'}, 'b': {'c'}, 'c': {'b'}}) == ['b', 'c', 'b']
+
+
+def test_short_form_functions():
+    body = '\n'.join([
+        'Resources:',
+        '  VPC: {Type: AWS::EC2::VPC, Properties: {CidrBlock: 10.0.0.0/16}}',
+        '  RouteTable: {Type: AWS::EC2::RouteTable, Properties: {VpcId: !Ref VPC}}',
+        '  Route:',
+        '    Type: AWS::EC2::Route',
+        '    Properties: {RouteTableId: !GetAtt RouteTable.RouteTableId, GatewayId: !Ref Gateway}',
+    ])
+
+    assert check_template(yaml.load(body, Loader=TemplateLoader), REGION) == [
+        'Route: Ref Gateway refers to unknown resource or parameter'
+    ]
+
+
+@pytest.mark.parametrize('properties, error', [
+    ({'CidrBlock': '10.1.0.0/24'}, '10.1.0.0/24 is not in VPC 10.0.0.0/16'),
+    ({'CidrBlock': '10.0.0.128/25'}, '10.0.0.128/25 is overlapped with 10.0.0.0/24'),
+    ({'CidrBlock': '10.0.0.0/33'}, 'invalid CIDR 10.0.0.0/33'),
+    ({'AvailabilityZone': 'us-east-1a'}, 'us-east-1a is not in ap-northeast-2'),
+])
+def test_subnet_errors(properties, error):
+    subnet = {
+        'Type': 'AWS::EC2::Subnet',
+        'Properties': dict({'VpcId': {'Ref': 'VPC'}, 'CidrBlock': '10.0.1.0/24', 'AvailabilityZone': 'ap-northeast-2a'},
+                           **properties),
+    }
+
+    assert f'Other: {error}' in check_template(make_template(Other=subnet), REGION)
+
+
+def test_literal_vpc_id_is_not_checked():
+    subnet = {'Type': 'AWS::EC2::Subnet', 'Properties': {'VpcId': 'vpc-0123', 'CidrBlock': '192.168.0.0/24'}}
+
+    assert check_template(make_template(Other=subnet), REGION) == []
@@ -0,0 +1,90 @@
+import pytest
+
+from vpc_cli.builder import build_template
+from vpc_cli.check import check_template
+from vpc_cli.nested import RESOURCE_LIMIT, find_refs, split_template
+
+REGION = 'ap-northeast-2'
+AZS = ['ap-northeast-2a', 'ap-northeast-2b', 'ap-northeast-2c', 'ap-northeast-2d']
+
+
+def make_spec(private=60, public=3):
+    # nat gateways of every public subnet are shared by the private route tables
+    public_names = [f'public-{i}' for i in range(public)]
+    private_names = [f'private-{i}' for i in range(private)]
+
+    return {
+        'project': 'test',
+        'region': REGION,
+        'vpc': {'name': 'test-vpc', 'cidr': '10.0.0.0/16'},
+        'subnets': {
+            'public': [{'name': name, 'cidr': f'10.0.{i}.0/24', 'az': AZS[i % len(AZS)]}
+                       for i, name in enumerate(public_names)],
+            'private': [{'name': name, 'prefix': 26, 'az': AZS[i % len(AZS)]} for i, name in enumerate(private_names)],
+        },
+        'igw': 'test-igw',
+        'nat': [{'name': f'nat-{i}', 'eip': f'eip-{i}', 'subnet': name} for i, name in enumerate(public_names)],
+        'route-tables': {
+            'public': 'public-rt',
+            'private': [{'name': f'{name}-rt', 'subnet': name, 'nat': f'nat-{i % public}'}
+                        for i, name in enumerate(private_names)],
+        },
+        'endpoints': {'s3': ['public-rt'] + [f'{name}-rt' for name in private_names]},
+    }
+
+
+@pytest.mark.parametrize('strategy', ['tier', 'az'])
+def test_split_templates_pass_check(strategy):
+    template = build_template(make_spec())
+    parent, children = split_template(template, strategy, max_resources=50)
+
+    assert len(children) > 1
+    assert check_template(parent, REGION) == []
+
+    for child in children.values():
+        assert check_template(child, REGION) == []
+
+    # every resource ends up in exactly one template
+    logical_ids = [logical_id for child in children.values() for logical_id in child['Resources']]
+    logical_ids.extend(logical_id for logical_id in parent['Resources'] if logical_id not in children)
+
+    assert sorted(logical_ids) == sorted(template['Resources'])
+
+
+def test_split_references_are_wired_through_parameters_and_outputs():
+    parent, children = split_template(build_template(make_spec()), 'tier', max_resources=50)
+
+    for stack, child in children.items():
+        properties = parent['Resources'][stack]['Properties']
+        parameters = properties.get('Parameters', {})
+
+        # parameters of the child are passed by the parent and nothing else
+        assert sorted(parameters) == sorted(child.get('Parameters', {}))
+
+        for value in parameters.values():
+            for target, attribute in find_refs(value):
+                if target in children:
+                    assert attribute.startswith('Outputs.')
+                    assert attribute[len('Outputs.'):] in children[target]['Outputs']
+                    assert target in parent['Resources'][stack]['DependsOn']
+
+        # references inside the child are to its own resources or its parameters
+        for target, _ in find_refs(child['Resources']):
+            assert target in child['Resources'] or target in parameters
+
+
+def test_nat_routes_stay_with_their_route_table():
+    template = build_template(make_spec(private=600))
+    parent, children = split_template(template)
+
+    routes = [logical_id for logical_id, resource in template['Resources'].items()
+              if resource['Type'] == 'AWS::EC2::Route' and 'NatGatewayId' in resource['Properties']]
+
+    assert len(routes) == 600
+    assert not set(routes) & set(parent['Resources'])
+    assert len(parent['Resources']) <= RESOURCE_LIMIT
+
+
+def test_split_over_limits_raises():
+    with pytest.raises(ValueError, match='resources, limit is'):
+        split_template(build_template(make_spec(private=600)), max_resources=5000)
@@ -0,0 +1,130 @@
+from bisect import bisect_left, insort
+
+from vpc_cli.tools import cidr_range
+
+AWS_RESERVED_IPS = 5
+MIN_SUBNET_PREFIX = 16
+MAX_SUBNET_PREFIX = 28
+
+
+def to_cidr(first, prefix):
+    return '{}.{}.{}.{}/{}'.format(first >> 24 & 0xff, first >> 16 & 0xff, first >> 8 & 0xff, first & 0xff, prefix)
+
+
+def cidr_prefix(cidr):
+    _, _, prefix = cidr.partition('/')
+
+    return int(prefix) if prefix else 32
+
+
+def hosts_to_prefix(hosts):
+    # smallest subnet whose usable addresses (minus the 5 reserved by aws) fit hosts
+    prefix = MAX_SUBNET_PREFIX
+
+    while (1 << (32 - prefix)) - AWS_RESERVED_IPS < hosts:
+        prefix -= 1
+
+        if prefix < MIN_SUBNET_PREFIX:
+            raise ValueError(f'{hosts} hosts do not fit in a /{MIN_SUBNET_PREFIX} subnet')
+
+    return prefix
+
+
+def subnet_prefix(request):
+    # request is prefix length (24, '/24') or {'prefix': 24} or {'hosts': 200}
+    if isinstance(request, dict):
+        if request.get('hosts') is not None:
+            return hosts_to_prefix(int(request['hosts']))
+
+        request = request.get('prefix')
+
+    prefix = int(str(request).lstrip('/'))
+
+    if not MIN_SUBNET_PREFIX <= prefix <= MAX_SUBNET_PREFIX:
+        raise ValueError(f'subnet prefix must be between /{MIN_SUBNET_PREFIX} and /{MAX_SUBNET_PREFIX}')
+
+    return prefix
+
+
+class SubnetAllocator:
+    # buddy allocator, free blocks are kept per prefix length as sorted start addresses
+    vpc_prefix = None
+    free = None
+
+    def __init__(self, vpc_cidr, reserved=()):
+        first, _ = cidr_range(vpc_cidr)
+        self.vpc_prefix = cidr_prefix(vpc_cidr)
+        self.free = {prefix: [] for prefix in range(self.vpc_prefix, 33)}
+        self.free[self.vpc_prefix].append(first)
+
+        for cidr in reserved:
+            self.reserve(cidr)
+
+    def find(self, prefix):
+        # smallest free block which can hold prefix, lowest address first
+        for block_prefix in range(min(prefix, 32), self.vpc_prefix - 1, -1):
+            if self.free[block_prefix]:
+                return block_prefix, self.free[block_prefix][0]
+
+        return None, None
+
+    def split(self, first, block_prefix, prefix):
+        # release upper halves of the block while splitting down to prefix
+        while block_prefix < prefix:
+            block_prefix += 1
+            insort(self.free[block_prefix], first + (1 << (32 - block_prefix)))
+
+    def suggest(self, prefix):
+        if prefix < self.vpc_prefix:
+            return None
+
+        _, first = self.find(prefix)
+
+        return to_cidr(first, prefix) if first is not None else None
+
+    def allocate(self, prefix):
+        block_prefix, first = self.find(prefix) if prefix >= self.vpc_prefix else (None, None)
+
+        if first is None:
+            raise ValueError(f'no free /{prefix} block in VPC CIDR')
+
+        self.free[block_prefix].pop(0)
+        self.split(first, block_prefix, prefix)
+
+        return to_cidr(first, prefix)
+
+    def allocate_many(self, prefixes):
+        # larger blocks first keeps every block aligned without holes, results keep request order
+        cidrs = [None] * len(prefixes)
+
+        for i in sorted(range(len(prefixes)), key=lambda x: prefixes[x]):
+            cidrs[i] = self.allocate(prefixes[i])
+
+        return cidrs
+
+    def reserve(self, cidr):
+        first, _ = cidr_range(cidr)
+        prefix = cidr_prefix(cidr)
+
+        for block_prefix in range(prefix, self.vpc_prefix - 1, -1):
+            block = first & ~((1 << (32 - block_prefix)) - 1)
+            blocks = self.free[block_prefix]
+            i = bisect_left(blocks, block)
+
+            if i < len(blocks) and blocks[i] == block:
+                blocks.pop(i)
+
+                # keep the half which doesn't hold cidr at each level
+                while block_prefix < prefix:
+                    block_prefix += 1
+                    half = 1 << (32 - block_prefix)
+
+                    if first & half:
+                        insort(self.free[block_prefix], block)
+                        block += half
+                    else:
+                        insort(self.free[block_prefix], block + half)
+
+                return
+
+        raise ValueError(f'{cidr} is overlapped or out of VPC CIDR')
@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import threading
+
+from vpc_cli.tracker import THROTTLING_ERRORS
+
+START_KEY = 'vpc_cli_start'
+OPERATION_KEY = 'vpc_cli_operation'
+PROMETHEUS_PREFIX = 'vpc_cli_aws_api'
+
+
+def get_operation(model):
+    return model.service_model.service_name, model.name
+
+
+def get_error_code(response):
+    # response of needs-retry is (http response, parsed) or None
+    if response is None:
+        return None
+
+    return response[1].get('Error', {}).get('Code')
+
+
+class ApiStats:
+    # per (service, operation) calls, latency, retries, throttles and errors of every hooked session
+    enabled = False
+    operations = None
+
+    def __init__(self):
+        self.operations = {}
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def instrument(self, session):
+        # clients copy the session event handlers when they are created, so call this before creating clients
+        if self.enabled:
+            events = session.events
+            # last, so waiting in the deploy rate limiter is not counted as latency
+            events.register_last('before-call', self.before_call)
+            events.register('after-call', self.after_call)
+            events.register('after-call-error', self.after_call_error)
+            events.register('needs-retry', self.needs_retry)
+
+        return session
+
+    def get_operation_stats(self, key):
+        return self.operations.setdefault(key, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'throttles': 0, 'latency': 0.0, 'max_latency': 0.0
+        })
+
+    def record(self, operation, context, retries=0, error=False):
+        # operation is (service, operation name)
+        latency = time.perf_counter() - context.get(START_KEY, time.perf_counter())
+
+        with self.lock:
+            stats = self.get_operation_stats(operation)
+            stats['calls'] += 1
+            stats['errors'] += error
+            stats['retries'] += retries
+            stats['latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+
+    def before_call(self, model, context, **kwargs):
+        context[START_KEY] = time.perf_counter()
+        context[OPERATION_KEY] = get_operation(model)
+
+    def after_call(self, model, http_response, parsed, context, **kwargs):
+        retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        self.record(get_operation(model), context, retries, http_response.status_code >= 300)
+
+    def after_call_error(self, exception, context, **kwargs):
+        # connection errors, after-call is not emitted and there is no model, before-call saved the operation
+        if OPERATION_KEY in context:
+            self.record(context[OPERATION_KEY], context, error=True)
+
+    def needs_retry(self, operation, response=None, **kwargs):
+        # emitted for every attempt, only throttled attempts are counted
+        if get_error_code(response) in THROTTLING_ERRORS:
+            with self.lock:
+                self.get_operation_stats(get_operation(operation))['throttles'] += 1
+
+    def get_rows(self):
+        with self.lock:
+            return [
+                [service, operation, stats['calls'], stats['retries'], stats['throttles'], stats['errors'],
+                 stats['latency'] / stats['calls'] if stats['calls'] else 0.0, stats['max_latency']]
+                for (service, operation), stats in sorted(self.operations.items())
+            ]
+
+    def print_summary(self, stream=None):
+        from prettytable import PrettyTable
+
+        table = PrettyTable()
+        table.set_style(15)
+        table.title = 'AWS API Calls'
+        table.field_names = ['Service', 'Operation', 'Calls', 'Retries', 'Throttles', 'Errors', 'Avg (ms)', 'Max (ms)']
+        table.align = 'r'
+        table.align['Service'] = 'l'
+        table.align['Operation'] = 'l'
+
+        for row in self.get_rows():
+            table.add_row(row[:6] + [f'{row[6] * 1000:.1f}', f'{row[7] * 1000:.1f}'])
+
+        print(table, file=stream or sys.stderr)
+
+    def get_prometheus(self):
+        metrics = [
+            ('calls_total', 'counter', 'API calls', 'calls'),
+            ('retries_total', 'counter', 'retried attempts', 'retries'),
+            ('throttles_total', 'counter', 'throttled attempts', 'throttles'),
+            ('errors_total', 'counter', 'failed API calls', 'errors'),
+            ('latency_seconds_sum', 'counter', 'total latency of API calls including retries', 'latency'),
+            ('latency_seconds_max', 'gauge', 'slowest API call', 'max_latency'),
+        ]
+        lines = []
+
+        with self.lock:
+            for name, metric_type, description, field in metrics:
+                lines.append(f'# HELP {PROMETHEUS_PREFIX}_{name} {description}')
+                lines.append(f'# TYPE {PROMETHEUS_PREFIX}_{name} {metric_type}')
+
+                for (service, operation), stats in sorted(self.operations.items()):
+                    lines.append(f'{PROMETHEUS_PREFIX}_{name}{{service="{service}",operation="{operation}"}} '
+                                 f'{stats[field]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        # textfile collectors read whole files, so write to a temporary file and rename
+        temp_path = f'{path}.{os.getpid()}.tmp'
+
+        with open(temp_path, 'w') as f:
+            f.write(self.get_prometheus())
+
+        os.replace(temp_path, path)
+
+
+api_stats = ApiStats()
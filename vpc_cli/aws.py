@@ -0,0 +1,65 @@
+import threading
+
+from vpc_cli.api_stats import api_stats
+
+MAX_POOL_CONNECTIONS = 50
+RETRY_MODE = 'adaptive'
+MAX_ATTEMPTS = 10  # retries after the first attempt
+
+
+class ClientFactory:
+    # one session per (profile, region) and one client per (profile, region, service, endpoint),
+    # so credentials are resolved once and concurrent calls share warm connections
+    max_pool_connections = MAX_POOL_CONNECTIONS
+    retry_mode = RETRY_MODE
+    max_attempts = MAX_ATTEMPTS
+    sessions = None
+    clients = None
+
+    def __init__(self, max_pool_connections=MAX_POOL_CONNECTIONS, retry_mode=RETRY_MODE, max_attempts=MAX_ATTEMPTS):
+        self.max_pool_connections = max_pool_connections
+        self.retry_mode = retry_mode
+        self.max_attempts = max_attempts
+        self.sessions = {}
+        self.clients = {}
+        # sessions are not thread safe, every session and client is created while holding the lock
+        self.lock = threading.RLock()
+
+    def get_config(self):
+        # imported here, botocore is not loaded before a command needs it
+        from botocore.config import Config
+
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            retries={'mode': self.retry_mode, 'max_attempts': self.max_attempts}
+        )
+
+    def get_session(self, profile='default', region=None):
+        key = (profile, region)
+
+        with self.lock:
+            if key not in self.sessions:
+                import boto3
+
+                session = boto3.session.Session(profile_name=profile, region_name=region)
+                self.sessions[key] = api_stats.instrument(session)
+
+            return self.sessions[key]
+
+    def get_client(self, service, profile='default', region=None, endpoint_url=None):
+        key = (profile, region, service, endpoint_url)
+
+        with self.lock:
+            if key not in self.clients:
+                session = self.get_session(profile, region)
+                self.clients[key] = session.client(service, endpoint_url=endpoint_url, config=self.get_config())
+
+            return self.clients[key]
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+            self.clients.clear()
+
+
+aws_clients = ClientFactory()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+
+AZ_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.vpc-cli', 'azs.json')
+AZ_CACHE_TTL = 86400
+MAX_WORKERS = 16
+
+
+def describe_azs(client):
+    response = client.describe_availability_zones(
+        Filters=[
+            {'Name': 'zone-type', 'Values': ['availability-zone']},
+            {'Name': 'state', 'Values': ['available']},
+        ]
+    )
+
+    return sorted(zone['ZoneName'] for zone in response['AvailabilityZones'])
+
+
+def discover_azs(profile='default', max_workers=MAX_WORKERS):
+    # regions enabled for the account, then azs of every region at once
+    from concurrent.futures import ThreadPoolExecutor
+
+    from vpc_cli.aws import aws_clients
+
+    client = aws_clients.get_client('ec2', profile, aws_clients.get_session(profile).region_name or 'us-east-1')
+    regions = sorted(region['RegionName'] for region in client.describe_regions()['Regions'])
+    clients = [aws_clients.get_client('ec2', profile, region) for region in regions]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        azs = executor.map(describe_azs, clients)
+
+        return dict(zip(regions, azs))
+
+
+class AzCache:
+    path = AZ_CACHE_PATH
+    ttl = AZ_CACHE_TTL
+    entries = None
+
+    def __init__(self, path=AZ_CACHE_PATH, ttl=AZ_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = None  # profile -> {'updated': epoch seconds, 'regions': {region: [az]}}
+
+    def load(self):
+        if self.entries is None:
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+
+            except (OSError, ValueError):  # missing or broken cache is fetched again
+                self.entries = {}
+
+        return self.entries
+
+    def save(self):
+        # write to a temporary file and rename, so readers never see half of the file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+
+        with open(temp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+        os.replace(temp_path, self.path)
+
+    def is_stale(self, profile):
+        entry = self.load().get(profile)
+
+        return entry is None or entry['updated'] + self.ttl < time.time()
+
+    def refresh(self, profile):
+        self.load()[profile] = {'updated': time.time(), 'regions': discover_azs(profile)}
+        self.save()
+
+    def refresh_if_stale(self, profile):
+        if self.is_stale(profile):
+            self.refresh(profile)
+
+    def get_regions(self, profile):
+        entry = self.load().get(profile)
+
+        return sorted(entry['regions']) if entry else []
+
+    def get_azs(self, region, profile=None):
+        # profile entry first, then any profile which knows the region, expired entries are still served
+        entries = self.load()
+        candidates = [entries[profile]] if profile in entries else []
+        candidates.extend(entry for key, entry in entries.items() if key != profile)
+
+        for entry in candidates:
+            if region in entry['regions']:
+                return entry['regions'][region]
+
+        return None
+
+
+az_cache = AzCache()
@@ -0,0 +1,19 @@
+import io
+
+from vpc_cli.create_yaml import CreateYAML, dump_template
+from vpc_cli.spec import parse_spec
+
+
+# library api, nothing is shared between calls and nothing is written to disk,
+# so it can be called from many threads at once
+
+def build_template(spec):
+    # spec is a mapping in the same shape as the generate spec file
+    return CreateYAML(**parse_spec(spec), output=None).get_template()
+
+
+def render_template(spec, output_format='yaml'):
+    stream = io.StringIO()
+    dump_template(build_template(spec), stream, output_format)
+
+    return stream.getvalue()
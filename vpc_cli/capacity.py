@@ -0,0 +1,112 @@
+from vpc_cli.tools import cidr_range
+
+AWS_RESERVED_IPS = 5  # network, vpc router, dns, future use and broadcast addresses of every subnet
+TIERS = ['public', 'private', 'protected']
+
+
+def load_numpy():
+    # numpy is optional, the same sums are made in python without it
+    try:
+        import numpy
+
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def get_size(cidr):
+    first, last = cidr_range(cidr)
+
+    return last - first + 1
+
+
+def group_sums(codes, sizes, usable, np=None):
+    # {code: (subnets, total ips, usable ips)} of non negative integer group codes
+    if np is None:
+        sums = {}
+
+        for code, size, free in zip(codes, sizes, usable):
+            group = sums.setdefault(code, [0, 0, 0])
+            group[0] += 1
+            group[1] += size
+            group[2] += free
+
+        return {code: tuple(group) for code, group in sums.items()}
+
+    codes, inverse = np.unique(np.asarray(codes, dtype=np.int64), return_inverse=True)
+    # float weights are exact for sums below 2 ** 53
+    counts = np.bincount(inverse)
+    totals = np.bincount(inverse, weights=sizes).astype(np.int64)
+    usables = np.bincount(inverse, weights=usable).astype(np.int64)
+
+    return dict(zip(codes.tolist(), zip(counts.tolist(), totals.tolist(), usables.tolist())))
+
+
+class CapacityPlan:
+    # usable ips per subnet, tier and az, and free space of every vpc, vpcs are parse_spec options
+    vpcs = None
+    subnets = None  # (vpc index, tier index, subnet)
+    sizes = None
+    usable = None
+    tiers = None  # (vpc index, tier) -> (subnets, total, usable)
+    azs = None  # (vpc index, az) -> (subnets, total, usable)
+    allocated = None  # (subnets, total, usable) per vpc index
+
+    def __init__(self, vpcs, use_numpy=True):
+        np = load_numpy() if use_numpy else None
+        self.vpcs = list(vpcs)
+        self.subnets = [
+            (i, tier, subnet)
+            for i, vpc in enumerate(self.vpcs)
+            for tier, name in enumerate(TIERS)
+            for subnet in vpc.get(f'{name}_subnet') or []
+        ]
+        prefixes = [int(subnet['cidr'].partition('/')[2]) for _, _, subnet in self.subnets]
+        az_names = sorted({subnet['az'] for _, _, subnet in self.subnets})
+        az_codes = {az: code for code, az in enumerate(az_names)}
+        vpc_codes = [i for i, _, _ in self.subnets]
+
+        # group codes are vpc index * groups + group, so every vpc is summed in one pass
+        tier_codes = [i * len(TIERS) + tier for i, tier, _ in self.subnets]
+        az_group_codes = [i * len(az_names) + az_codes[subnet['az']] for i, _, subnet in self.subnets]
+
+        if np is None:
+            sizes = [1 << (32 - prefix) for prefix in prefixes]
+            usable = [max(size - AWS_RESERVED_IPS, 0) for size in sizes]
+
+        else:
+            sizes = np.left_shift(np.int64(1), 32 - np.asarray(prefixes, dtype=np.int64))
+            usable = np.maximum(sizes - AWS_RESERVED_IPS, 0)
+
+        self.tiers = {
+            divmod(code, len(TIERS)): stats for code, stats in group_sums(tier_codes, sizes, usable, np).items()
+        }
+        self.azs = {
+            (code // len(az_names), az_names[code % len(az_names)]): stats
+            for code, stats in group_sums(az_group_codes, sizes, usable, np).items()
+        }
+        allocated = group_sums(vpc_codes, sizes, usable, np)
+        # plain ints for the row writers
+        self.sizes = sizes if np is None else sizes.tolist()
+        self.usable = usable if np is None else usable.tolist()
+        self.allocated = [allocated.get(i, (0, 0, 0)) for i in range(len(self.vpcs))]
+
+    def get_subnet_rows(self):
+        for (i, tier, subnet), size, usable in zip(self.subnets, self.sizes, self.usable):
+            yield [self.vpcs[i]['vpc']['name'], TIERS[tier].capitalize(), subnet['az'], subnet['name'], subnet['cidr'],
+                   size, usable]
+
+    def get_tier_rows(self):
+        for (i, tier), (count, size, usable) in sorted(self.tiers.items()):
+            yield [self.vpcs[i]['vpc']['name'], TIERS[tier].capitalize(), count, size, usable]
+
+    def get_az_rows(self):
+        for (i, az), (count, size, usable) in sorted(self.azs.items()):
+            yield [self.vpcs[i]['vpc']['name'], az, count, size, usable]
+
+    def get_vpc_rows(self):
+        for vpc, (count, allocated, usable) in zip(self.vpcs, self.allocated):
+            size = get_size(vpc['vpc']['cidr'])
+            yield [vpc['vpc']['name'], vpc['vpc']['cidr'], size, count, allocated, usable, size - allocated,
+                   round(allocated * 100 / size, 1)]
@@ -0,0 +1,71 @@
+import time
+
+CHANGE_SET_PREFIX = 'vpc-cli'
+CHANGE_SET_DONE_STATUS = ['CREATE_COMPLETE', 'FAILED', 'DELETE_COMPLETE', 'DELETE_FAILED']
+# status reasons of a change set which has nothing to update
+EMPTY_CHANGE_SET_REASONS = ["didn't contain changes", 'No updates are to be performed']
+
+
+def create_change_set(client, stack_name, template_source, tags=None):
+    # template_source is TemplateBody or TemplateURL, see nested.template_source
+    response = client.create_change_set(
+        StackName=stack_name,
+        ChangeSetName=f'{CHANGE_SET_PREFIX}-{time.strftime("%Y%m%d%H%M%S")}',
+        ChangeSetType='UPDATE',
+        Capabilities=['CAPABILITY_NAMED_IAM'],
+        Tags=tags or [],
+        IncludeNestedStacks=True,
+        **template_source
+    )
+
+    return response['Id']
+
+
+def describe_change_set(client, change_set_id):
+    # every page of changes in one response
+    response = client.describe_change_set(ChangeSetName=change_set_id)
+    changes = response['Changes']
+
+    while response.get('NextToken'):
+        response = client.describe_change_set(ChangeSetName=change_set_id, NextToken=response['NextToken'])
+        changes.extend(response['Changes'])
+
+    response['Changes'] = changes
+
+    return response
+
+
+def wait_change_set(client, change_set_id, min_delay=1, max_delay=10, backoff=1.5, sleep=time.sleep):
+    delay = min_delay
+
+    while True:
+        response = client.describe_change_set(ChangeSetName=change_set_id)
+
+        if response['Status'] in CHANGE_SET_DONE_STATUS:
+            return describe_change_set(client, change_set_id) if response.get('NextToken') else response
+
+        sleep(delay)
+        delay = min(delay * backoff, max_delay)
+
+
+def is_empty(change_set):
+    reason = change_set.get('StatusReason') or ''
+
+    return change_set['Status'] == 'FAILED' and any(text in reason for text in EMPTY_CHANGE_SET_REASONS)
+
+
+def get_resource_changes(change_set):
+    # (action, logical id, physical id, type, replacement) of every changed resource
+    rows = []
+
+    for change in change_set['Changes']:
+        resource = change['ResourceChange']
+        rows.append([
+            resource['Action'],
+            resource['LogicalResourceId'],
+            resource.get('PhysicalResourceId', ''),
+            resource['ResourceType'],
+            resource.get('Replacement', ''),
+        ])
+
+    return rows
@@ -0,0 +1,220 @@
+import re
+
+import yaml
+
+from vpc_cli.cidr_index import CidrIndex
+from vpc_cli.nested import find_refs, get_depends_on
+from vpc_cli.tools import cidr_contains, cidr_range, get_azs
+
+# region part of an az name, e.g. us-west-2 of us-west-2a and us-west-2-lax-1a
+AZ_REGION = re.compile(r'^([a-z]+-[a-z]+-\d+)')
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+class TemplateLoader(SafeLoader):
+    # safe loader which reads short form intrinsic functions, e.g. !Ref and !GetAtt
+    pass
+
+
+def construct_function(loader, suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+
+    if suffix == 'Ref':
+        return {'Ref': value}
+
+    if suffix == 'GetAtt' and isinstance(value, str):
+        value = value.split('.', 1)
+
+    return {f'Fn::{suffix}': value}
+
+
+TemplateLoader.add_multi_constructor('!', construct_function)
+
+
+def load_template(path):
+    # yaml or json, json is a subset of yaml
+    with open(path) as f:
+        return yaml.load(f, Loader=TemplateLoader)
+
+
+def get_dependencies(template):
+    # logical id -> resources it needs first, plus errors of unresolved references
+    resources = template.get('Resources', {})
+    parameters = template.get('Parameters', {})
+    dependencies = {}
+    errors = []
+
+    for logical_id, resource in resources.items():
+        targets = set()
+        ref_errors = []
+        refs = find_refs(resource.get('Properties', {}), errors=ref_errors)
+        errors.extend(f'{logical_id}: {error}' for error in ref_errors)
+
+        for target, attribute in refs:
+            if target in resources:
+                targets.add(target)
+
+            elif attribute is not None:
+                errors.append(f'{logical_id}: Fn::GetAtt {target}.{attribute} refers to unknown resource')
+
+            elif target not in parameters and not target.startswith('AWS::'):
+                errors.append(f'{logical_id}: Ref {target} refers to unknown resource or parameter')
+
+        for target in get_depends_on(resource):
+            if target in resources:
+                targets.add(target)
+
+            else:
+                errors.append(f'{logical_id}: DependsOn {target} refers to unknown resource')
+
+        dependencies[logical_id] = targets
+
+    return dependencies, errors
+
+
+def find_cycle(dependencies):
+    # iterative depth first search, returns logical ids of one cycle or None
+    state = {}  # 1 visiting, 2 done
+
+    for start in dependencies:
+        if start in state:
+            continue
+
+        path = [start]
+        stack = [iter(sorted(dependencies[start]))]
+        state[start] = 1
+
+        while stack:
+            target = next(stack[-1], None)
+
+            if target is None:
+                state[path.pop()] = 2
+                stack.pop()
+
+            elif state.get(target) == 1:
+                return path[path.index(target):] + [target]
+
+            elif target not in state:
+                state[target] = 1
+                path.append(target)
+                stack.append(iter(sorted(dependencies[target])))
+
+    return None
+
+
+def check_cidrs(resources):
+    errors = []
+    vpc_cidrs = {}
+    subnet_cidrs = {}
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] == 'AWS::EC2::VPC':
+            cidr = resource.get('Properties', {}).get('CidrBlock')
+
+            try:
+                cidr_range(cidr)
+                vpc_cidrs[logical_id] = cidr
+
+            except (ValueError, AttributeError):
+                errors.append(f'{logical_id}: invalid CIDR {cidr}')
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] != 'AWS::EC2::Subnet':
+            continue
+
+        properties = resource.get('Properties', {})
+        cidr = properties.get('CidrBlock')
+        vpc_id = properties.get('VpcId')
+        # literal vpc ids (vpc-0abc) and other functions have no vpc in the template to check against
+        vpc = vpc_id.get('Ref') if isinstance(vpc_id, dict) else None
+
+        try:
+            cidr_range(cidr)
+
+        except (ValueError, AttributeError):
+            errors.append(f'{logical_id}: invalid CIDR {cidr}')
+            continue
+
+        if not isinstance(vpc, str) or vpc not in vpc_cidrs:  # vpc from a parameter can not be checked
+            continue
+
+        if not cidr_contains(vpc_cidrs[vpc], cidr):
+            errors.append(f'{logical_id}: {cidr} is not in {vpc} {vpc_cidrs[vpc]}')
+
+        index = subnet_cidrs.setdefault(vpc, CidrIndex())
+        overlapped = index.get_overlapped(cidr)
+
+        if overlapped:
+            errors.append(f'{logical_id}: {cidr} is overlapped with {overlapped}')
+
+        else:
+            index.add(cidr)
+
+    return errors
+
+
+def check_azs(resources, region=None):
+    errors = []
+    azs = None
+
+    if region:
+        try:
+            azs = set(get_azs(region))
+
+        except KeyError:
+            return [f'region: unsupported region {region}']
+
+    regions = set()
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] != 'AWS::EC2::Subnet':
+            continue
+
+        az = resource.get('Properties', {}).get('AvailabilityZone')
+
+        if not isinstance(az, str):  # e.g. Fn::Select of Fn::GetAZs
+            continue
+
+        if azs is not None and az not in azs:
+            errors.append(f'{logical_id}: {az} is not in {region}')
+
+        match = AZ_REGION.match(az)
+        regions.add(match.group(1) if match else az)
+
+    if len(regions) > 1:
+        errors.append(f'subnets are in more than one region: {", ".join(sorted(regions))}')
+
+    return errors
+
+
+def check_template(template, region=None):
+    # returns list of error messages, empty when the template is consistent
+    if not isinstance(template, dict) or not isinstance(template.get('Resources'), dict):
+        return ['Resources: must be a mapping']
+
+    resources = template['Resources']
+    malformed = [logical_id for logical_id, resource in resources.items()
+                 if not isinstance(resource, dict) or 'Type' not in resource]
+
+    if malformed:
+        return [f'{logical_id}: resource must be a mapping with Type' for logical_id in malformed]
+
+    dependencies, errors = get_dependencies(template)
+    cycle = find_cycle(dependencies)
+
+    if cycle:
+        errors.append(f'circular dependency: {" -> ".join(cycle)}')
+
+    errors.extend(check_cidrs(resources))
+    errors.extend(check_azs(resources, region))
+
+    return errors
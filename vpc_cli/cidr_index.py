@@ -0,0 +1,70 @@
+from bisect import bisect_right
+
+from vpc_cli.tools import cidr_range
+
+
+class CidrIndex:
+    # non-overlapping cidr blocks kept as sorted integer intervals,
+    # so overlap and containment are answered with one binary search
+    firsts = None
+    lasts = None
+    cidrs = None
+
+    def __init__(self, cidrs=()):
+        ranges = sorted((cidr_range(cidr) + (cidr,) for cidr in cidrs))
+
+        for (_, last, cidr), (first, _, other) in zip(ranges, ranges[1:]):
+            if first <= last:
+                raise ValueError(f'{cidr} is overlapped with {other}')
+
+        self.firsts = [first for first, _, _ in ranges]
+        self.lasts = [last for _, last, _ in ranges]
+        self.cidrs = [cidr for _, _, cidr in ranges]
+
+    def __len__(self):
+        return len(self.firsts)
+
+    def __iter__(self):
+        return iter(self.cidrs)
+
+    def __contains__(self, cidr):
+        return self.contains(cidr)
+
+    def find(self, cidr):
+        # position of the block which overlaps cidr, or -1
+        first, last = cidr_range(cidr)
+        i = bisect_right(self.firsts, last) - 1
+
+        if i >= 0 and self.lasts[i] >= first:
+            return i
+
+        return -1
+
+    def overlaps(self, cidr):
+        return self.find(cidr) >= 0
+
+    def contains(self, cidr):
+        first, last = cidr_range(cidr)
+        i = bisect_right(self.firsts, first) - 1
+
+        return i >= 0 and self.lasts[i] >= last
+
+    def get_overlapped(self, cidr):
+        i = self.find(cidr)
+
+        return self.cidrs[i] if i >= 0 else None
+
+    def add(self, cidr):
+        # list.insert moves the tail, O(n) per add, build the index from all blocks at once when they are known
+        first, last = cidr_range(cidr)
+        i = bisect_right(self.firsts, last)
+
+        if i > 0 and self.lasts[i - 1] >= first:
+            raise ValueError(f'{cidr} is overlapped with {self.cidrs[i - 1]}')
+
+        self.firsts.insert(i, first)
+        self.lasts.insert(i, last)
+        self.cidrs.insert(i, cidr)
+
+    def append(self, cidr):  # list compatible alias
+        self.add(cidr)
@@ -1,43 +1,81 @@
-import boto3
 from inquirer import prompt, List, Text, Confirm, Checkbox
-from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 
+from vpc_cli.allocator import SubnetAllocator, MAX_SUBNET_PREFIX, cidr_prefix
+from vpc_cli.az_cache import az_cache
+from vpc_cli.cidr_index import CidrIndex
 from vpc_cli.print_table import PrintTable
 from vpc_cli.create_yaml import CreateYAML
 from vpc_cli.deploy_cfn import DeployCfn
+from vpc_cli.timings import timed
 from vpc_cli.tools import get_azs, print_figlet, bright_cyan
-from vpc_cli.validators import name_validator, vpc_cidr_validator, subnet_count_validator, subnet_cidr_validator, \
-    stack_name_validator
+from vpc_cli.validators import name_validator, vpc_cidr_validator, subnet_count_validator, subnet_cidr_validator
+
+
+REGION_NAMES = {
+    'us-east-1': 'N. Virginia',
+    'us-east-2': 'Ohio',
+    'us-west-1': 'N. California',
+    'us-west-2': 'Oregon',
+    'ap-south-1': 'Mumbai',
+    'ap-northeast-3': 'Osaka',
+    'ap-northeast-2': 'Seoul',
+    'ap-southeast-1': 'Singapore',
+    'ap-southeast-2': 'Sydney',
+    'ap-northeast-1': 'Tokyo',
+    'ca-central-1': 'Canada Central',
+    'eu-central-1': 'Frankfurt',
+    'eu-west-1': 'Ireland',
+    'eu-west-2': 'London',
+    'eu-west-3': 'Paris',
+    'eu-north-1': 'Stockholm',
+    'sa-east-1': 'Sao Paulo'
+}
 
 
 class Command:
-    # variables
+    # variables, containers are created per instance in __init__
+    profile = None
+    table_format = 'table'
     project = None
     region = None
-    vpc = {
-        'name': None,
-        'cidr': None
-    }
-    subnet_cidrs = []
-    public_subnet = []
-    private_subnet = []
-    protected_subnet = []
+    vpc = None
+    subnet_cidrs = None
+    allocator = None
+    public_subnet = None
+    private_subnet = None
+    protected_subnet = None
     k8S_tag = False
-    flow_logs = {
-        'log-group': None,
-        'role-name': None
-    }
+    flow_logs = None
     igw = None
-    eip = []
-    nat = []
+    eip = None
+    nat = None
     public_rtb = None
-    private_rtb = []
+    private_rtb = None
     protected_rtb = None
     s3_gateway_ep = None
     dynamodb_gateway_ep = None
 
     # start command
-    def __init__(self, profile):
+    def __init__(self, profile, table_format='table'):
+        self.profile = profile
+        self.table_format = table_format
+        self.vpc = {
+            'name': None,
+            'cidr': None
+        }
+        self.subnet_cidrs = CidrIndex()
+        self.public_subnet = []
+        self.private_subnet = []
+        self.protected_subnet = []
+        self.flow_logs = {
+            'log-group': None,
+            'role-name': None
+        }
+        self.eip = []
+        self.nat = []
+        self.private_rtb = []
+
         print_figlet()
         self.print_profile(profile)
         self.set_project_name()
@@ -95,7 +133,7 @@ class Command:
         self.print_tables()
 
         # create template yaml file
-        yaml_file = CreateYAML(
+        CreateYAML(
             project=self.project,
             region=self.region,
             vpc=self.vpc,
@@ -112,12 +150,12 @@ class Command:
             dynamodb_gateway_ep=self.dynamodb_gateway_ep,
             flow_logs=self.flow_logs
         )
-        yaml_file.create_yaml()
-        DeployCfn(project=self.project, region=self.region, profile=profile)
+        DeployCfn(project=self.project, region=self.region, profile=profile, table_format=table_format)
 
     def print_profile(self, profile='default'):
         print(f'Using AWS Profile {bright_cyan(profile)}')
 
+    @timed('command.set_project_name')
     def set_project_name(self):
         questions = [
             Text(
@@ -130,29 +168,25 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.project = answer['name']
 
+    @timed('command.choose_region')
     def choose_region(self):
+        # regions and azs are discovered once a day and cached on disk
+        try:
+            az_cache.refresh_if_stale(self.profile)
+
+        except (BotoCoreError, ClientError, OSError) as e:
+            print(f'Can not discover regions, using built-in list: {e}')
+
+        regions = az_cache.get_regions(self.profile) or list(REGION_NAMES)
+        width = max(len(region) for region in regions)
+
         questions = [
             List(
                 name='region',
                 message='Choose region',
                 choices=[
-                    ('us-east-1      (N. Virginia)', 'us-east-1'),
-                    ('us-east-2      (Ohio)', 'us-east-2'),
-                    ('us-west-1      (N. California)', 'us-west-1'),
-                    ('us-west-2      (Oregon)', 'us-west-2'),
-                    ('ap-south-1     (Mumbai)', 'ap-south-1'),
-                    ('ap-northeast-3 (Osaka)', 'ap-northeast-3'),
-                    ('ap-northeast-2 (Seoul)', 'ap-northeast-2'),
-                    ('ap-southeast-1 (Singapore)', 'ap-southeast-1'),
-                    ('ap-southeast-2 (Sydney)', 'ap-southeast-2'),
-                    ('ap-northeast-1 (Tokyo)', 'ap-northeast-1'),
-                    ('ca-central-1   (Canada Central)', 'ca-central-1'),
-                    ('eu-central-1   (Frankfurt)', 'eu-central-1'),
-                    ('eu-west-1      (Ireland)', 'eu-west-1'),
-                    ('eu-west-2      (London)', 'eu-west-2'),
-                    ('eu-west-3      (Paris)', 'eu-west-3'),
-                    ('eu-north-1     (Stockholm)', 'eu-north-1'),
-                    ('sa-east-1      (Sao Paulo)', 'sa-east-1')
+                    (f'{region:<{width}} ({REGION_NAMES[region]})' if region in REGION_NAMES else region, region)
+                    for region in regions
                 ]
             )
         ]
@@ -160,6 +194,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.region = answer.get('region')
 
+    @timed('command.set_vpc')
     def set_vpc(self):
         questions = [
             Text(
@@ -181,6 +216,15 @@ class Command:
         global vpc_cidr
         vpc_cidr = answer['cidr']
 
+        self.allocator = SubnetAllocator(answer['cidr'])
+
+    def suggest_subnet_cidr(self):
+        # offer next free aligned block, /24 for /16 vpc
+        prefix = min(max(cidr_prefix(self.vpc['cidr']) + 4, 24), MAX_SUBNET_PREFIX)
+
+        return self.allocator.suggest(prefix) or ''
+
+    @timed('command.set_public_subnet')
     def set_public_subnet(self):
         questions = [
             Confirm(
@@ -214,22 +258,25 @@ class Command:
                     Text(
                         name='cidr',
                         message='Public Subnet {} CIDR'.format(i + 1),
-                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs)
+                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs),
+                        default=self.suggest_subnet_cidr()
                     ),
                     List(
                         name='az',
                         message='Public Subnet {} AZ'.format(i + 1),
-                        choices=get_azs(self.region)
+                        choices=get_azs(self.region, self.profile)
                     )
                 ]
 
                 subnet_answer = prompt(questions=questions, raise_keyboard_interrupt=True)
                 self.public_subnet.append(subnet_answer)
-                self.subnet_cidrs.append(subnet_answer['cidr'])
+                self.subnet_cidrs.add(subnet_answer['cidr'])
+                self.allocator.reserve(subnet_answer['cidr'])
 
         else:  # not create public subnets
             return None
 
+    @timed('command.set_private_subnet')
     def set_private_subnet(self):
         questions = [
             Confirm(
@@ -263,22 +310,25 @@ class Command:
                     Text(
                         name='cidr',
                         message='Private Subnet {} CIDR'.format(i + 1),
-                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs)
+                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs),
+                        default=self.suggest_subnet_cidr()
                     ),
                     List(
                         name='az',
                         message='Private Subnet {} AZ'.format(i + 1),
-                        choices=get_azs(self.region)
+                        choices=get_azs(self.region, self.profile)
                     )
                 ]
 
                 subnet_answer = prompt(questions=questions, raise_keyboard_interrupt=True)
                 self.private_subnet.append(subnet_answer)
-                self.subnet_cidrs.append(subnet_answer['cidr'])
+                self.subnet_cidrs.add(subnet_answer['cidr'])
+                self.allocator.reserve(subnet_answer['cidr'])
 
         else:  # not create private subnets
             return None
 
+    @timed('command.set_protected_subnet')
     def set_protected_subnet(self):
         questions = [
             Confirm(
@@ -311,22 +361,25 @@ class Command:
                     Text(
                         name='cidr',
                         message='Protected Subnet {} CIDR'.format(i + 1),
-                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs)
+                        validate=lambda _, x: subnet_cidr_validator(x, self.vpc['cidr'], self.subnet_cidrs),
+                        default=self.suggest_subnet_cidr()
                     ),
                     List(
                         name='az',
                         message='Protected Subnet {} AZ'.format(i + 1),
-                        choices=get_azs(self.region)
+                        choices=get_azs(self.region, self.profile)
                     )
                 ]
 
                 subnet_answer = prompt(questions=questions, raise_keyboard_interrupt=True)
                 self.protected_subnet.append(subnet_answer)
-                self.subnet_cidrs.append(subnet_answer['cidr'])
+                self.subnet_cidrs.add(subnet_answer['cidr'])
+                self.allocator.reserve(subnet_answer['cidr'])
 
         else:  # not create protected subnets
             return None
 
+    @timed('command.set_subnet_k8s_tags')
     def set_subnet_k8s_tags(self):
         questions = [
             Confirm(
@@ -339,6 +392,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.k8S_tag = answer['k8s-tag']
 
+    @timed('command.set_internet_gateway')
     def set_internet_gateway(self):
         questions = [
             Text(
@@ -351,6 +405,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.igw = answer['name']
 
+    @timed('command.set_elastic_ip')
     def set_elastic_ip(self):
         for i in range(0, len(self.private_subnet)):
             questions = [
@@ -364,6 +419,7 @@ class Command:
             answer = prompt(questions=questions, raise_keyboard_interrupt=True)
             self.eip.append(answer['name'])
 
+    @timed('command.set_nat_gateway')
     def set_nat_gateway(self):
         for i in range(0, len(self.private_subnet)):
             questions = [
@@ -391,6 +447,7 @@ class Command:
             answer = prompt(questions=questions, raise_keyboard_interrupt=True)
             self.nat.append(answer)
 
+    @timed('command.set_public_rtb')
     def set_public_rtb(self):
         questions = [
             Text(
@@ -403,6 +460,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.public_rtb = answer['name']
 
+    @timed('command.set_private_rtb')
     def set_private_rtb(self):
         for i in range(0, len(self.private_subnet)):
             questions = [
@@ -433,6 +491,7 @@ class Command:
             answer = prompt(questions=questions, raise_keyboard_interrupt=True)
             self.private_rtb.append(answer)
 
+    @timed('command.set_protected_rtb')
     def set_protected_rtb(self):
         questions = [
             Text(
@@ -445,6 +504,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.protected_rtb = answer['name']
 
+    @timed('command.set_s3_gateway')
     def set_s3_gateway(self):
         route_table_list = []
 
@@ -469,6 +529,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.s3_gateway_ep = answer
 
+    @timed('command.set_dynamodb_gateway')
     def set_dynamodb_gateway(self):
         route_table_list = []
 
@@ -492,6 +553,7 @@ class Command:
         answer = prompt(questions=questions, raise_keyboard_interrupt=True)
         self.dynamodb_gateway_ep = answer
 
+    @timed('command.set_flow_logs')
     def set_flow_logs(self):
         question = [
             Confirm(
@@ -523,58 +585,20 @@ class Command:
                 'role-name': answer.get('log-group-role-name'),
             }
 
+    @timed('command.print_tables')
     def print_tables(self):
-        print_table = PrintTable()
-        print_table.print_vpc(self.region, self.vpc)
-        print_table.print_subnets(
+        PrintTable(self.table_format).print_summary(
+            region=self.region,
+            vpc=self.vpc,
             public_subnet=self.public_subnet,
             private_subnet=self.private_subnet,
             protected_subnet=self.protected_subnet,
-            public_rtb=self.public_rtb,
-            private_rtb=self.private_rtb,
-            protected_rtb=self.protected_rtb
-        )
-        print_table.print_route_tables(
+            igw=self.igw,
             public_rtb=self.public_rtb,
             private_rtb=self.private_rtb,
             protected_rtb=self.protected_rtb,
-            igw=self.igw
+            nat=self.nat,
+            s3_gateway_ep=self.s3_gateway_ep,
+            dynamodb_gateway_ep=self.dynamodb_gateway_ep,
+            flow_logs=self.flow_logs
         )
-        print_table.print_igw(igw=self.igw)
-        print_table.print_nat(nat=self.nat)
-        print_table.print_ep(s3_gateway_ep=self.s3_gateway_ep, dynamodb_gateway_ep=self.dynamodb_gateway_ep)
-        print_table.print_flow_logs(flow_logs=self.flow_logs)
-
-    def create_stack(self):
-        questions = [
-            Confirm(
-                name='deploy',
-                message='Do you want to deploy stack in \033[1m\033[96m{}\033[0mtest?'.format(self.region),
-                default=True
-            )
-        ]
-
-        answer = prompt(questions, raise_keyboard_interrupt=True)
-
-        if answer['deploy']:
-            questions = [
-                Text(
-                    name='stack-name',
-                    message='Type your stack name',
-                    validate=lambda _, x: stack_name_validator(x, self.region)
-                )
-            ]
-
-            answer = prompt(questions, raise_keyboard_interrupt=True)
-
-            try:
-                client = boto3.client('cloudformation', config=Config(region_name=self.region))
-
-                response = client.create_stack(
-                    StackName=answer['stack-name'],
-                    TemplateBody='file://template.yaml'
-                )
-                stack_id = response['StackId']
-
-            except Exception as e:
-                print(e)
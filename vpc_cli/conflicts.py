@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from vpc_cli.tools import cidr_range
+
+VPC_CIDR_TYPES = ['AWS::EC2::VPC', 'AWS::EC2::VPCCidrBlock']
+CONFLICT_FIELDS = ['VPC', 'CIDR', 'Other VPC', 'Other CIDR']
+
+
+def find_conflicts(blocks):
+    # (vpc, cidr, other vpc, other cidr) of every overlapping pair of [(vpc, cidr)], blocks of the same vpc are
+    # not compared. two cidr blocks are either disjoint or one contains the other, so after sorting by first
+    # address (larger block first) the blocks still open at an address are a stack of nested blocks and every
+    # block overlaps exactly the blocks on the stack: O(n log n) to sort plus one step per reported pair
+    ranges = sorted((cidr_range(cidr) + (vpc, cidr) for vpc, cidr in blocks), key=lambda x: (x[0], -x[1]))
+    stack = []
+
+    for first, last, vpc, cidr in ranges:
+        while stack and stack[-1][1] < first:
+            stack.pop()
+
+        for _, _, other_vpc, other_cidr in stack:
+            if other_vpc != vpc:
+                yield other_vpc, other_cidr, vpc, cidr
+
+        stack.append((first, last, vpc, cidr))
+
+
+def get_template_blocks(template, source):
+    # vpc cidrs of a template, CidrBlock of AWS::EC2::VPC and secondary AWS::EC2::VPCCidrBlock resources
+    blocks = []
+
+    for logical_id, resource in (template.get('Resources') or {}).items():
+        if not isinstance(resource, dict) or resource.get('Type') not in VPC_CIDR_TYPES:
+            continue
+
+        properties = resource.get('Properties')
+        cidr = properties.get('CidrBlock') if isinstance(properties, dict) else None
+
+        # intrinsic functions (Ref of a parameter, Fn::Select of Fn::Cidr) can not be resolved here
+        if not isinstance(cidr, str):
+            continue
+
+        if resource['Type'] == 'AWS::EC2::VPC':
+            vpc = f'{source}:{logical_id}'
+
+        else:
+            vpc_id = properties.get('VpcId')
+            vpc = f'{source}:{vpc_id["Ref"]}' if isinstance(vpc_id, dict) and 'Ref' in vpc_id else \
+                f'{source}:{logical_id}'
+
+        blocks.append((vpc, cidr))
+
+    return blocks
+
+
+def get_file_blocks(path):
+    # spec file (vpc.cidr) or template file (Resources)
+    from vpc_cli.check import load_template
+    from vpc_cli.spec import check_mapping
+
+    document = load_template(path)
+
+    if not isinstance(document, dict):
+        raise ValueError('must be a spec or template mapping')
+
+    if 'Resources' in document:
+        check_mapping(document['Resources'] or {}, 'Resources')
+
+        return get_template_blocks(document, path)
+
+    cidr = check_mapping(document.get('vpc') or {}, 'vpc').get('cidr')
+
+    if not isinstance(cidr, str):
+        raise ValueError('vpc.cidr: is required')
+
+    return [(path, cidr)]
+
+
+def check_blocks(blocks):
+    # raises ValueError of the first invalid cidr, before the sweep starts
+    for vpc, cidr in blocks:
+        cidr_range(cidr)
+
+    return blocks
+
+
+def describe_vpc_blocks(client):
+    # every associated cidr block of every vpc of the client region, secondary blocks included
+    from vpc_cli.importer import DESCRIBES, describe_all
+
+    region = client.meta.region_name
+    blocks = []
+
+    for vpc in describe_all(client, *DESCRIBES['vpcs']):
+        for association in vpc.get('CidrBlockAssociationSet') or [{'CidrBlock': vpc['CidrBlock']}]:
+            if association.get('CidrBlockState', {}).get('State', 'associated') == 'associated':
+                blocks.append((f'{region}/{vpc["VpcId"]}', association['CidrBlock']))
+
+    return blocks
+
+
+def describe_region_blocks(clients, max_workers=8):
+    # vpc cidr blocks of many regions at once, clients are created before the threads start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [block for blocks in executor.map(describe_vpc_blocks, clients) for block in blocks]
@@ -1,14 +1,33 @@
+import json
+
 import yaml
 
+try:  # libyaml based dumper is much faster when available
+    from yaml import CDumper as Dumper
+except ImportError:
+    from yaml import Dumper
+
+from vpc_cli.resource_graph import ResourceGraph
+from vpc_cli.timings import timed, timings
+from vpc_cli.tools import bright_red
+
+
+def dump_template(template, stream, output_format='yaml'):
+    if output_format == 'json':
+        json.dump(template, stream, separators=(',', ':'))
+
+    else:
+        yaml.dump(template, stream, Dumper=Dumper)
+
 
 class CreateYAML:
-    resources = {}
+    # containers are created per instance, a class level dict would be shared by every template
+    graph = None
+    resources = None
     project = ''
     region = None
-    public_subnet_name = {}
-    private_subnet_name = {}
-    protected_subnet_name = []
-    rtb_name = []
+    output = 'vpc.yaml'
+    output_format = 'yaml'
 
     def __init__(
             self,
@@ -26,10 +45,16 @@ class CreateYAML:
             nat=None,
             s3_gateway_ep=None,
             dynamodb_gateway_ep=None,
-            flow_logs=None
+            flow_logs=None,
+            output='vpc.yaml',
+            output_format='yaml'
     ):
         self.project = project
         self.region = region
+        self.output = output
+        self.output_format = output_format
+        self.graph = ResourceGraph()
+        self.resources = self.graph.resources
         self.create_vpc(vpc=vpc)
         self.create_subnets(
             public_subnet=public_subnet,
@@ -43,8 +68,12 @@ class CreateYAML:
         self.create_s3_ep(s3_gateway_ep=s3_gateway_ep)
         self.create_dynamodb_ep(dynamodb_gateway_ep=dynamodb_gateway_ep)
         self.create_flow_logs(flow_logs=flow_logs)
-        self.create_yaml()
 
+        # build only, when output is None
+        if output:
+            self.create_yaml()
+
+    @timed('template.create_vpc')
     def create_vpc(self, vpc):
         self.resources['VPC'] = {
             'Type': 'AWS::EC2::VPC',
@@ -57,10 +86,11 @@ class CreateYAML:
             }
         }
 
+    @timed('template.create_subnets')
     def create_subnets(self, public_subnet=None, private_subnet=None, protected_subnet=None, set_k8s_tags=False):
         if public_subnet:
             for i, subnet in enumerate(public_subnet):
-                self.resources['PublicSubnet' + str(i)] = {
+                self.graph.add('PublicSubnet' + str(i), kind='public_subnet', name=subnet['name'], resource={
                     'Type': 'AWS::EC2::Subnet',
                     'Properties': {
                         'AvailabilityZone': subnet['az'],
@@ -71,8 +101,7 @@ class CreateYAML:
                             'Ref': 'VPC'
                         }
                     }
-                }
-                self.public_subnet_name[subnet['name']] = 'PublicSubnet' + str(i)
+                })
 
                 if set_k8s_tags:
                     self.resources['PublicSubnet' + str(i)]['Properties']['Tags'].append(
@@ -81,7 +110,7 @@ class CreateYAML:
 
         if private_subnet:
             for i, subnet in enumerate(private_subnet):
-                self.resources['PrivateSubnet' + str(i)] = {
+                self.graph.add('PrivateSubnet' + str(i), kind='private_subnet', name=subnet['name'], resource={
                     'Type': 'AWS::EC2::Subnet',
                     'Properties': {
                         'AvailabilityZone': subnet['az'],
@@ -92,9 +121,7 @@ class CreateYAML:
                             'Ref': 'VPC'
                         }
                     }
-                }
-                # self.private_subnet_name.append({'cloudformation': 'PrivateSubnet' + str(i), 'name': subnet['name']})
-                self.private_subnet_name[subnet['name']] = 'PrivateSubnet' + str(i)
+                })
 
                 if set_k8s_tags:
                     self.resources['PrivateSubnet' + str(i)]['Properties']['Tags'].append(
@@ -103,7 +130,7 @@ class CreateYAML:
 
         if protected_subnet:
             for i, subnet in enumerate(protected_subnet):
-                self.resources['ProtectedSubnet' + str(i)] = {
+                self.graph.add('ProtectedSubnet' + str(i), kind='protected_subnet', name=subnet['name'], resource={
                     'Type': 'AWS::EC2::Subnet',
                     'Properties': {
                         'AvailabilityZone': subnet['az'],
@@ -114,18 +141,17 @@ class CreateYAML:
                             'Ref': 'VPC'
                         }
                     }
-                }
-                self.protected_subnet_name.append(
-                    {'cloudformation': 'ProtectedSubnet' + str(i), 'name': subnet['name']})
+                })
 
+    @timed('template.create_igw')
     def create_igw(self, igw=None, public_subnet=None):  # Create internet gateway when exists public subnet
         if public_subnet:
-            self.resources['IGW'] = {
+            self.graph.add('IGW', kind='igw', name=igw, resource={
                 'Type': 'AWS::EC2::InternetGateway',
                 'Properties': {
                     'Tags': [{'Key': 'Name', 'Value': igw}, {'Key': 'project', 'Value': self.project}]
                 }
-            }
+            })
             self.resources['IGWAttachmentVPC'] = {
                 'Type': 'AWS::EC2::VPCGatewayAttachment',
                 'Properties': {
@@ -151,10 +177,11 @@ class CreateYAML:
                 }
             }
 
+    @timed('template.create_route_tables')
     def create_route_tables(self, public_rtb=None, private_rtb=None, protected_rtb=None):
         if public_rtb:
             # create public route table
-            self.resources['PublicRouteTable'] = {
+            self.graph.add('PublicRouteTable', kind='route_table', name=public_rtb, resource={
                 'Type': 'AWS::EC2::RouteTable',
                 'Properties': {
                     'Tags': [{'Key': 'Name', 'Value': public_rtb}, {'Key': 'project', 'Value': self.project}],
@@ -162,10 +189,10 @@ class CreateYAML:
                         'Ref': 'VPC'
                     }
                 }
-            }
+            })
 
             # associate public subnets to public route table
-            for _, subnet_cfn_name in self.public_subnet_name.items():
+            for subnet_cfn_name in self.graph.ids('public_subnet'):
                 self.resources[subnet_cfn_name + 'RouteTableAssociation'] = {
                     'Type': 'AWS::EC2::SubnetRouteTableAssociation',
                     'Properties': {
@@ -178,12 +205,10 @@ class CreateYAML:
                     }
                 }
 
-            self.rtb_name.append({'cloudformation': 'PublicRouteTable', 'name': public_rtb})
-
         if private_rtb:
             # create private route tables
             for i, rtb in enumerate(private_rtb):
-                self.resources['PrivateRouteTable' + str(i)] = {
+                self.graph.add('PrivateRouteTable' + str(i), kind='route_table', name=rtb['name'], resource={
                     'Type': 'AWS::EC2::RouteTable',
                     'Properties': {
                         'Tags': [{'Key': 'Name', 'Value': rtb['name']}, {'Key': 'project', 'Value': self.project}],
@@ -191,12 +216,10 @@ class CreateYAML:
                             'Ref': 'VPC'
                         }
                     }
-                }
+                })
 
                 # associate each private subnet to each private route table
-                # subnet_cloudformation_name = next(
-                #     item for item in self.private_subnet_name if item['name'] == rtb['subnet'])
-                subnet_cfn_name = self.private_subnet_name[rtb['subnet']]
+                subnet_cfn_name = self.graph.get_id('private_subnet', rtb['subnet'])
                 self.resources[subnet_cfn_name + 'RouteTableAssociation'] = {
                     'Type': 'AWS::EC2::SubnetRouteTableAssociation',
                     'Properties': {
@@ -209,12 +232,9 @@ class CreateYAML:
                     }
                 }
 
-                self.rtb_name.append(
-                    {'cloudformation': 'PrivateRouteTable' + str(i), 'name': rtb['name']})
-
         if protected_rtb:
             # create protected route table
-            self.resources['ProtectRouteTable'] = {
+            self.graph.add('ProtectRouteTable', kind='route_table', name=protected_rtb, resource={
                 'Type': 'AWS::EC2::RouteTable',
                 'Properties': {
                     'Tags': [{'Key': 'Name', 'Value': protected_rtb}, {'Key': 'project', 'Value': self.project}],
@@ -222,15 +242,15 @@ class CreateYAML:
                         'Ref': 'VPC'
                     }
                 }
-            }
+            })
 
             # associate protected subnets to protected route table
-            for subnet_name in self.protected_subnet_name:
-                self.resources[subnet_name['cloudformation'] + 'RouteTableAssociation'] = {
+            for subnet_cfn_name in self.graph.ids('protected_subnet'):
+                self.resources[subnet_cfn_name + 'RouteTableAssociation'] = {
                     'Type': 'AWS::EC2::SubnetRouteTableAssociation',
                     'Properties': {
                         'SubnetId': {
-                            'Ref': subnet_name['cloudformation']
+                            'Ref': subnet_cfn_name
                         },
                         'RouteTableId': {
                             'Ref': 'ProtectRouteTable'
@@ -238,11 +258,10 @@ class CreateYAML:
                     }
                 }
 
-            self.rtb_name.append({'cloudformation': 'ProtectRouteTable', 'name': protected_rtb})
-
+    @timed('template.create_nat')
     def create_nat(self, nat=None, private_rtb=None):
         # create nat
-        for i, _nat in enumerate(nat):
+        for i, _nat in enumerate(nat or []):
             # create elastic ip
             self.resources['EIP' + str(i)] = {
                 'Type': 'AWS::EC2::EIP',
@@ -252,8 +271,8 @@ class CreateYAML:
             }
 
             # create nat gateway
-            subnet_cfn_name = self.public_subnet_name[_nat['subnet']]
-            self.resources['NAT' + str(i)] = {
+            subnet_cfn_name = self.graph.get_id('public_subnet', _nat['subnet'])
+            self.graph.add('NAT' + str(i), kind='nat', name=_nat['name'], resource={
                 'Type': 'AWS::EC2::NatGateway',
                 'DependsOn': 'PublicRouteTableRouteIGW',
                 'Properties': {
@@ -265,18 +284,21 @@ class CreateYAML:
                     },
                     'Tags': [{'Key': 'Name', 'Value': _nat['name']}, {'Key': 'project', 'Value': self.project}]
                 }
-            }
+            })
+
+        # routing, every private route table to its nat gateway
+        for rtb in private_rtb or []:
+            if not rtb.get('nat'):
+                continue
 
-            # routing
-            nat_rtb_name = next(item for item in private_rtb if item['nat'] == _nat['name'])
-            rtb_cfn_name = next(item for item in self.rtb_name if item['name'] == nat_rtb_name['name'])[
-                'cloudformation']
-            self.resources['{}RouteNAT{}'.format(rtb_cfn_name, str(i))] = {
+            rtb_cfn_name = self.graph.get_id('route_table', rtb['name'])
+            nat_cfn_name = self.graph.get_id('nat', rtb['nat'])
+            self.resources['{}Route{}'.format(rtb_cfn_name, nat_cfn_name)] = {
                 'Type': 'AWS::EC2::Route',
                 'Properties': {
                     'DestinationCidrBlock': '0.0.0.0/0',
                     'NatGatewayId': {
-                        'Ref': 'NAT' + str(i)
+                        'Ref': nat_cfn_name
                     },
                     'RouteTableId': {
                         'Ref': rtb_cfn_name
@@ -284,13 +306,13 @@ class CreateYAML:
                 }
             }
 
+    @timed('template.create_s3_ep')
     def create_s3_ep(self, s3_gateway_ep):
         if s3_gateway_ep and s3_gateway_ep.get('route-table'):
             rtb_list = []
 
             for rtb in s3_gateway_ep['route-table']:
-                rtb_name = next(item for item in self.rtb_name if item['name'] == rtb)
-                rtb_list.append({'Ref': rtb_name['cloudformation']})
+                rtb_list.append({'Ref': self.graph.get_id('route_table', rtb)})
 
             self.resources['S3EP'] = {
                 'Type': 'AWS::EC2::VPCEndpoint',
@@ -303,13 +325,13 @@ class CreateYAML:
                 }
             }
 
+    @timed('template.create_dynamodb_ep')
     def create_dynamodb_ep(self, dynamodb_gateway_ep):
         if dynamodb_gateway_ep and dynamodb_gateway_ep.get('route-table'):
             rtb_list = []
 
             for rtb in dynamodb_gateway_ep['route-table']:
-                rtb_name = next(item for item in self.rtb_name if item['name'] == rtb)
-                rtb_list.append({'Ref': rtb_name['cloudformation']})
+                rtb_list.append({'Ref': self.graph.get_id('route_table', rtb)})
 
             self.resources['DynamoDBEP'] = {
                 'Type': 'AWS::EC2::VPCEndpoint',
@@ -322,8 +344,9 @@ class CreateYAML:
                 }
             }
 
+    @timed('template.create_flow_logs')
     def create_flow_logs(self, flow_logs):
-        if flow_logs.get('log-group', None) is not None and flow_logs.get('role-name', None) is not None:
+        if flow_logs and flow_logs.get('log-group') is not None and flow_logs.get('role-name') is not None:
             self.resources['FlowLogIamRole'] = {
                 'Type': 'AWS::IAM::Role',
                 'Properties': {
@@ -368,7 +391,7 @@ class CreateYAML:
                 'Type': 'AWS::EC2::FlowLog',
                 'Properties': {
                     'DeliverLogsPermissionArn': {
-                        'Fn::GetAtt': 'FlowLogIamRole.Arn'
+                        'Fn::GetAtt': ['FlowLogIamRole', 'Arn']
                     },
                     'LogGroupName': flow_logs.get('log-group'),
                     'ResourceId': {
@@ -380,16 +403,24 @@ class CreateYAML:
                 }
             }
 
-    def create_yaml(self):
-        template = {
+    def get_template(self):
+        return {
             'AWSTemplateFormatVersion': '2010-09-09',
             'Description': 'VPC Stack Generator CLI',
             'Resources': self.resources
         }
 
+    @timed('template.create_yaml')
+    def create_yaml(self):
+        template = self.get_template()
+
         try:
-            with open('vpc.yaml', 'w') as f:
-                yaml.dump(template, f)
+            with open(self.output, 'w') as f:
+                dump_template(template, f, self.output_format)
+                timings.add_bytes('template.create_yaml', f.tell())
 
         except Exception as e:
-            print(e)
+            print(f'{bright_red(e)}')
+            return False
+
+        return True
@@ -1,35 +1,57 @@
-import boto3
-from inquirer import prompt, Confirm, Text
+import yaml
+from inquirer import prompt, Confirm, List, Text
 from datetime import datetime
 from dateutil import tz
-from prettytable import PrettyTable
-from cfn_visualizer import visualizer
+from botocore.exceptions import ClientError
 
+from vpc_cli.aws import aws_clients
+from vpc_cli.change_set import create_change_set, wait_change_set, is_empty, get_resource_changes
+from vpc_cli.nested import needs_split, split_template, template_body, template_source, upload_children
+from vpc_cli.print_table import PrintTable, get_table
+from vpc_cli.resources import list_resources
+from vpc_cli.stack_names import stack_names
+from vpc_cli.template_cache import is_deployed
+from vpc_cli.timings import timed, timings
 from vpc_cli.validators import stack_name_validator
 from vpc_cli.tools import bright_red, bright_green
+from vpc_cli.tracker import StackTracker, FAILED_STATUS
 
 
 class DeployCfn:
     client = None
     deploy = False
+    update = False
     project = ''
     name = ''
     region = ''
     profile = 'default'
+    table_format = 'table'
 
     def __init__(
             self,
             project,
             region,
             profile='default',
+            table_format='table',
     ):
         self.project = project
         self.region = region
         self.profile = profile
+        self.table_format = table_format
+        stack_names.prefetch(profile, region)
         self.ask_deployment()
-        self.input_stack_name()
+
+        if self.deploy:
+            self.ask_update()
+
+        if self.update:
+            self.choose_stack_name()
+        else:
+            self.input_stack_name()
+
         self.deployment(project, self.name, region, profile)
 
+    @timed('deploy.ask_deployment')
     def ask_deployment(self):
         questions = [
             Confirm(
@@ -41,6 +63,39 @@ class DeployCfn:
 
         self.deploy = prompt(questions=questions, raise_keyboard_interrupt=True)['required']
 
+    @timed('deploy.ask_update')
+    def ask_update(self):
+        questions = [
+            Confirm(
+                name='update',
+                message='Do you want to update an existing stack with a change set?',
+                default=False
+            )
+        ]
+
+        self.update = prompt(questions=questions, raise_keyboard_interrupt=True)['update']
+
+    @timed('deploy.choose_stack_name')
+    def choose_stack_name(self):
+        choices = sorted(stack_names.get(self.profile, self.region))
+
+        if not choices:  # nothing to update, create a new stack instead
+            print(f'No CloudFormation Stacks in {self.region}, a new stack is created.')
+            self.update = False
+            self.input_stack_name()
+            return
+
+        questions = [
+            List(
+                name='name',
+                message='Choose CloudFormation Stack to update',
+                choices=choices
+            )
+        ]
+
+        self.name = prompt(questions=questions, raise_keyboard_interrupt=True)['name']
+
+    @timed('deploy.input_stack_name')
     def input_stack_name(self):
         questions = [
             Text(
@@ -52,46 +107,20 @@ class DeployCfn:
 
         self.name = prompt(questions=questions, raise_keyboard_interrupt=True)['name']
 
+    @timed('deploy.deployment')
     def deployment(self, project, name, region, profile='default'):
         if self.deploy:  # deploy using cloudformation
-            self.client = boto3.session.Session(profile_name=profile, region_name=region).client('cloudformation')
-            response = self.client.create_stack(
-                StackName=name,
-                TemplateBody=self.get_template(),
-                TimeoutInMinutes=15,
-                Tags=[{'Key': 'Name', 'Value': name}, {'Key': 'project', 'Value': self.project}],
-                Capabilities=['CAPABILITY_NAMED_IAM'],
-            )
-            stack_id = response['StackId']
-
-            while True:
-                # 1. get stack status
-                response = self.client.describe_stacks(
-                    StackName=name
-                )
-                stack_status = response['Stacks'][0]['StackStatus']
-
-                if stack_status in ['CREATE_FAILED', 'ROLLBACK_FAILED',
-                                    'ROLLBACK_COMPLETE']:  # create failed
-                    print()
-                    print(f'{bright_red("Failed!")}')
-                    print()
-                    print(f'{bright_red("Please check CloudFormation at here:")}')
-                    print()
-                    print(
-                        f'{bright_red(f"https://{region}.console.aws.amazon.com/cloudformation/home?region={region}#/stacks/stackinfo?stackId={stack_id}")}')
-
-                    break
-
-                elif stack_status == 'CREATE_COMPLETE':  # create complete successful
-                    print()
-                    self.print_table()
-                    print(f'{bright_green("Success!")}')
-
-                    break
+            self.client = aws_clients.get_client('cloudformation', profile, region)
 
+            # template is over the limits of cloudformation
+            try:
+                if self.update:
+                    self.update_stack(name)
                 else:
-                    visualizer(client=self.client, stack_name=self.name)
+                    self.create_stack(name)
+
+            except ValueError as e:
+                print(f'{bright_red(e)}')
 
         else:
             print('Done!\n\n')
@@ -100,6 +129,106 @@ class DeployCfn:
                 'aws cloudformation deploy --stack-name {} --region {} --template-file ./vpc.yaml'.format(
                     name, region))
 
+    def get_tags(self, name):
+        return [{'Key': 'Name', 'Value': name}, {'Key': 'project', 'Value': self.project}]
+
+    def create_stack(self, name):
+        template_source = self.get_template_source()
+
+        with timings.phase('deploy.create_stack'):
+            response = self.client.create_stack(
+                StackName=name,
+                **template_source,
+                TimeoutInMinutes=15,
+                Tags=self.get_tags(name),
+                Capabilities=['CAPABILITY_NAMED_IAM'],
+            )
+
+        stack_id = response['StackId']
+        stack_names.add(self.profile, self.region, name)
+
+        tracker = StackTracker(self.client, stack_id, on_event=self.print_event)
+        self.print_result(stack_id, self.wait_stack(tracker))
+
+    def wait_stack(self, tracker):
+        with timings.phase('deploy.poll'):
+            stack_status = tracker.wait()
+
+        timings.add_calls('deploy.describe_stack_events', tracker.api_calls)
+
+        return stack_status
+
+    def update_stack(self, name):
+        # only resources in the change set are touched, the rest of the vpc is left as it is
+        with timings.phase('deploy.compare_template'):
+            unchanged = is_deployed(self.client, name, self.get_template())
+
+        if unchanged:
+            print(f'{bright_green("No changes, stack is up to date.")}')
+            return None
+
+        template_source = self.get_template_source()
+
+        # e.g. stack in ROLLBACK_COMPLETE or still in progress
+        try:
+            with timings.phase('deploy.create_change_set'):
+                change_set_id = create_change_set(self.client, name, template_source, self.get_tags(name))
+                change_set = wait_change_set(self.client, change_set_id)
+
+        except ClientError as e:
+            print(f'{bright_red(f"Failed to create change set: {e}")}')
+            return None
+
+        if is_empty(change_set):
+            self.client.delete_change_set(ChangeSetName=change_set_id)
+            print(f'{bright_green("No changes, stack is up to date.")}')
+            return None
+
+        if change_set['Status'] != 'CREATE_COMPLETE':
+            # failed change sets stay on the stack until they are deleted
+            self.client.delete_change_set(ChangeSetName=change_set_id)
+            reason = change_set.get('StatusReason')
+            print(f'{bright_red(f"Failed to create change set: {reason}")}')
+            return None
+
+        self.print_changes(change_set)
+
+        questions = [
+            Confirm(
+                name='execute',
+                message=f'Do you want to apply {len(change_set["Changes"])} changes to {name}?',
+                default=True
+            )
+        ]
+
+        if not prompt(questions=questions, raise_keyboard_interrupt=True)['execute']:
+            self.client.delete_change_set(ChangeSetName=change_set_id)
+            print('Change set is deleted.')
+            return None
+
+        # skip events of previous deployments
+        tracker = StackTracker(self.client, change_set['StackId'], on_event=self.print_event)
+        tracker.mark()
+        self.client.execute_change_set(ChangeSetName=change_set_id)
+        self.print_result(change_set['StackId'], self.wait_stack(tracker))
+
+    def print_result(self, stack_id, stack_status):
+        region = self.region
+
+        if stack_status in FAILED_STATUS:  # create or update failed
+            print()
+            print(f'{bright_red("Failed!")}')
+            print()
+            print(f'{bright_red("Please check CloudFormation at here:")}')
+            print()
+            print(
+                f'{bright_red(f"https://{region}.console.aws.amazon.com/cloudformation/home?region={region}#/stacks/stackinfo?stackId={stack_id}")}')
+
+        else:  # create or update complete successful
+            print()
+            self.print_table()
+            print(f'{bright_green("Success!")}')
+
     def get_template(self):
         with open('vpc.yaml', 'r') as f:
             # content = yaml.full_load(f)
@@ -109,6 +238,29 @@ class DeployCfn:
 
         return content
 
+    @timed('deploy.template_source')
+    def get_template_source(self):
+        body = self.get_template()
+        template = yaml.safe_load(body)
+
+        if not needs_split(template):
+            return {'TemplateBody': body}
+
+        # over the inline template limits, upload nested stack templates to s3
+        questions = [
+            Text(
+                name='bucket',
+                message='Template is too large, type S3 bucket name for nested stack templates',
+                validate=lambda _, x: len(x) > 0
+            )
+        ]
+        bucket = prompt(questions=questions, raise_keyboard_interrupt=True)['bucket']
+        session = aws_clients.get_session(self.profile, self.region)
+        parent, children = split_template(template)
+        upload_children(parent, children, session, bucket)
+
+        return template_source(session, template_body(parent), bucket)
+
     def get_timestamp(self, timestamp: datetime):
         return timestamp.replace(tzinfo=tz.tzutc()).astimezone(tz.tzlocal()).strftime('%I:%M:%S %p')
 
@@ -122,20 +274,36 @@ class DeployCfn:
         elif 'COMPLETE' in status:
             return '92m'
 
-    def print_table(self):
-        table = PrettyTable()
-        table.set_style(15)
-        table.field_names = ['Logical ID', 'Physical ID', 'Type']
+    def print_event(self, event):
+        color = self.get_color(event['ResourceStatus']) or '0m'
+        reason = event.get('ResourceStatusReason') or ''
+
+        print(f'{self.get_timestamp(event["Timestamp"])}  \x1b[{color}{event["ResourceStatus"]:<32}\x1b[0m  '
+              f'{event["ResourceType"]:<40}  {event["LogicalResourceId"]}  {reason}')
+
+    def get_result_table(self, field_names):
+        table = get_table(field_names=field_names)
         table.vrules = 0
         table.hrules = 1
         table.align = 'l'
-        rows = []
 
-        response = self.client.describe_stack_resources(StackName=self.name)['StackResources']
+        return table
 
-        for resource in response:
-            rows.append([resource['LogicalResourceId'], resource['PhysicalResourceId'], resource['ResourceType']])
+    def print_changes(self, change_set):
+        field_names = ['Action', 'Logical ID', 'Physical ID', 'Type', 'Replacement']
+        with PrintTable(self.table_format) as print_table:
+            print_table.write('Changes', field_names, get_resource_changes(change_set),
+                              self.get_result_table(field_names))
+
+    @timed('deploy.print_table')
+    def print_table(self):
+        # describe_stack_resources returns at most 100 resources, pages are streamed instead
+        field_names = ['Logical ID', 'Physical ID', 'Type']
+        rows = ([resource['LogicalResourceId'], resource.get('PhysicalResourceId'), resource['ResourceType']]
+                for resource in list_resources(self.client, self.name))
+        table = self.get_result_table(field_names)
+        table.sortby = 'Type'
+        table.sort_key = lambda row: (row[0], row[1])  # type, logical id
 
-        rows = sorted(rows, key=lambda x: (x[2], x[0]))
-        table.add_rows(rows)
-        print(table)
+        with PrintTable(self.table_format) as print_table:
+            print_table.write('Resources', field_names, rows, table)
@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from vpc_cli.print_table import PrintTable, get_table
+from vpc_cli.spec import SpecError, load_spec
+from vpc_cli.template_cache import render_cached, template_cache
+from vpc_cli.tools import bright_red, bright_green
+
+
+def load_manifest(path, output_dir=None, output_format='yaml', cache=True):
+    with open(path, 'r') as f:
+        try:
+            manifest = yaml.safe_load(f)
+
+        except yaml.YAMLError as e:
+            raise SpecError(e.__str__())
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get('templates')
+
+    if not isinstance(manifest, list):
+        raise SpecError('manifest must be a list of templates')
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    output_dir = output_dir or base_dir
+    entries = []
+
+    for i, entry in enumerate(manifest):
+        if isinstance(entry, str):  # short form, only spec path
+            entry = {'spec': entry}
+
+        if not isinstance(entry, dict) or not entry.get('spec'):
+            raise SpecError(f'templates[{i}]: spec is required')
+
+        spec_path = os.path.join(base_dir, entry['spec'])
+        output = entry.get('output') or os.path.splitext(os.path.basename(spec_path))[0] + '.' + output_format
+
+        entries.append({
+            'spec': spec_path,
+            'output': os.path.join(output_dir, output),
+            'format': output_format,
+            'cache': cache,
+        })
+
+    return entries
+
+
+def render(entry):
+    # runs in worker process
+    start = time.perf_counter()
+    error = None
+    cached = False
+
+    try:
+        os.makedirs(os.path.dirname(entry['output']) or '.', exist_ok=True)
+        body, cached = render_cached(load_spec(entry['spec']), entry['format'],
+                                     template_cache if entry['cache'] else None)
+
+        with open(entry['output'], 'w') as f:
+            f.write(body)
+
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+
+    return {
+        'spec': entry['spec'],
+        'output': entry['output'],
+        'seconds': time.perf_counter() - start,
+        'cached': cached,
+        'error': error
+    }
+
+
+def generate_fleet(entries, jobs=None):
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(entries) // (jobs * 4))
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(render, entries, chunksize=chunksize))
+
+
+def get_result_rows(results, color=False):
+    for result in results:
+        status = result['error'] or ('CACHED' if result['cached'] else 'OK')
+
+        if color:
+            status = bright_red(status) if result['error'] else bright_green(status)
+
+        yield [result['spec'], result['output'], round(result['seconds'] * 1000, 1), status]
+
+
+def print_summary(results, elapsed, table_format='table'):
+    field_names = ['Spec', 'Output', 'Time (ms)', 'Status']
+    table = get_table('Templates', field_names)
+    table.align = 'l'
+    failed = sum(1 for result in results if result['error'])
+
+    with PrintTable(table_format) as print_table:
+        print_table.write('Templates', field_names, get_result_rows(results, table_format == 'table'), table)
+        print_table.write('Summary', ['Templates', 'Succeeded', 'Cached', 'Failed', 'Wall Time (s)', 'Slowest (ms)'],
+                          [[
+                              len(results),
+                              len(results) - failed,
+                              sum(1 for result in results if result['cached']),
+                              failed,
+                              round(elapsed, 2),
+                              round(max((result['seconds'] for result in results), default=0) * 1000, 1)
+                          ]])
+
+    return failed
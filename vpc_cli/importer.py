@@ -0,0 +1,298 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from vpc_cli.tools import cidr_contains
+
+DEFAULT_ROUTE = '0.0.0.0/0'
+MAX_FILTER_VALUES = 200  # values of one describe filter
+MAX_WORKERS = 8
+
+# resource type: (operation, result key, filter parameter, vpc filter name), every operation can paginate
+DESCRIBES = {
+    'vpcs': ('describe_vpcs', 'Vpcs', 'Filters', 'vpc-id'),
+    'subnets': ('describe_subnets', 'Subnets', 'Filters', 'vpc-id'),
+    'route_tables': ('describe_route_tables', 'RouteTables', 'Filters', 'vpc-id'),
+    'igws': ('describe_internet_gateways', 'InternetGateways', 'Filters', 'attachment.vpc-id'),
+    'nats': ('describe_nat_gateways', 'NatGateways', 'Filter', 'vpc-id'),
+    'endpoints': ('describe_vpc_endpoints', 'VpcEndpoints', 'Filters', 'vpc-id'),
+    'flow_logs': ('describe_flow_logs', 'FlowLogs', 'Filter', 'resource-id'),
+}
+
+
+def describe_all(client, operation, key, filter_parameter, filter_name, vpc_ids=None):
+    # every page of one describe operation, vpc ids are sent in chunks of the filter limit
+    chunks = [None] if vpc_ids is None else \
+        [vpc_ids[i:i + MAX_FILTER_VALUES] for i in range(0, len(vpc_ids), MAX_FILTER_VALUES)]
+    items = []
+
+    for chunk in chunks:
+        kwargs = {filter_parameter: [{'Name': filter_name, 'Values': chunk}]} if chunk else {}
+
+        for page in client.get_paginator(operation).paginate(**kwargs):
+            items.extend(page[key])
+
+    return items
+
+
+def describe_addresses(client):
+    # elastic ip names of nat gateways, describe_addresses has no pages
+    return client.describe_addresses()['Addresses']
+
+
+def fetch_resources(client, vpc_ids=None, max_workers=MAX_WORKERS):
+    # every describe of the region at once, one set of calls however many vpcs are imported,
+    # use max_workers=1 with botocore Stubber which expects calls in order
+    vpc_ids = sorted(vpc_ids) if vpc_ids else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(describe_all, client, *describe, vpc_ids)
+            for name, describe in DESCRIBES.items()
+        }
+        futures['addresses'] = executor.submit(describe_addresses, client)
+
+        return {name: future.result() for name, future in futures.items()}
+
+
+def get_name(resource, default):
+    for tag in resource.get('Tags') or []:
+        if tag['Key'] == 'Name' and tag['Value']:
+            return tag['Value']
+
+    return default
+
+
+def get_tag(resource, key):
+    return next((tag['Value'] for tag in resource.get('Tags') or [] if tag['Key'] == key), None)
+
+
+class UniqueNames:
+    # resource names are used as keys in the spec, duplicated tag names get a suffix
+    names = None
+
+    def __init__(self):
+        self.names = set()
+
+    def get(self, name):
+        unique = name
+        i = 2
+
+        while unique in self.names:
+            unique = f'{name}-{i}'
+            i += 1
+
+        self.names.add(unique)
+
+        return unique
+
+
+def group_by_vpc(resources):
+    # resource type -> vpc id -> resources
+    grouped = {}
+
+    for name, items in resources.items():
+        if name == 'addresses':
+            continue
+
+        groups = grouped.setdefault(name, {})
+
+        for item in items:
+            if name == 'igws':
+                vpc_ids = [attachment['VpcId'] for attachment in item.get('Attachments', [])]
+            elif name == 'flow_logs':
+                vpc_ids = [item['ResourceId']]
+            else:
+                vpc_ids = [item['VpcId']]
+
+            for vpc_id in vpc_ids:
+                groups.setdefault(vpc_id, []).append(item)
+
+    return grouped
+
+
+def get_default_target(route_table):
+    # ('igw', id), ('nat', id) or None of the default route
+    for route in route_table.get('Routes', []):
+        if route.get('DestinationCidrBlock') != DEFAULT_ROUTE or route.get('State') == 'blackhole':
+            continue
+
+        if route.get('NatGatewayId'):
+            return 'nat', route['NatGatewayId']
+
+        if (route.get('GatewayId') or '').startswith('igw-'):
+            return 'igw', route['GatewayId']
+
+    return None
+
+
+def build_spec(vpc, resources, region, addresses=None):
+    # reconstructs the generate spec of one vpc, returns (spec, warnings of what the spec can not express)
+    vpc_id = vpc['VpcId']
+    warnings = []
+    names = UniqueNames()
+    subnets = sorted(resources.get('subnets', {}).get(vpc_id, []), key=lambda s: s['SubnetId'])
+    route_tables = resources.get('route_tables', {}).get(vpc_id, [])
+    nats = {nat['NatGatewayId']: nat for nat in resources.get('nats', {}).get(vpc_id, [])
+            if nat.get('State') in ('available', 'pending')}
+    igws = resources.get('igws', {}).get(vpc_id, [])
+    eip_names = {address['AllocationId']: get_name(address, address['AllocationId'])
+                 for address in addresses or [] if address.get('AllocationId')}
+
+    if len(vpc.get('CidrBlockAssociationSet', [])) > 1:
+        warnings.append('secondary CIDR blocks are not imported')
+
+    # route table of every subnet, subnets without association use the main route table
+    main_rtb = next((rtb for rtb in route_tables
+                     if any(a.get('Main') for a in rtb.get('Associations', []))), None)
+    subnet_rtb = {}
+
+    for rtb in route_tables:
+        for association in rtb.get('Associations', []):
+            if association.get('SubnetId'):
+                subnet_rtb[association['SubnetId']] = rtb
+
+    subnet_names = {}
+    tiers = {'public': [], 'private': [], 'protected': []}
+
+    for subnet in subnets:
+        if not cidr_contains(vpc['CidrBlock'], subnet['CidrBlock']):
+            warnings.append(f'{subnet["SubnetId"]}: {subnet["CidrBlock"]} is not in primary CIDR, skipped')
+            continue
+
+        target = get_default_target(subnet_rtb.get(subnet['SubnetId']) or main_rtb or {})
+        tier = 'public' if target and target[0] == 'igw' else 'private' if target else 'protected'
+        subnet_names[subnet['SubnetId']] = names.get(get_name(subnet, subnet['SubnetId']))
+        tiers[tier].append(subnet)
+
+    # private subnets need a nat gateway in a public subnet, others have no internet route
+    public_ids = {subnet['SubnetId'] for subnet in tiers['public']}
+
+    for subnet in list(tiers['private']):
+        nat = nats.get(get_default_target(subnet_rtb.get(subnet['SubnetId']) or main_rtb)[1])
+
+        if nat is None or nat['SubnetId'] not in public_ids:
+            warnings.append(f'{subnet["SubnetId"]}: NAT Gateway is not in a public subnet, imported as protected')
+            tiers['private'].remove(subnet)
+            tiers['protected'].append(subnet)
+
+    spec_subnets = {
+        tier: [{'name': subnet_names[s['SubnetId']], 'cidr': s['CidrBlock'], 'az': s['AvailabilityZone']}
+               for s in items]
+        for tier, items in tiers.items() if items
+    }
+
+    # nat gateways used by private route tables
+    nat_names = {}
+    spec_nat = []
+    private_rtbs = []
+    rtb_names = {}  # route table id -> spec route table names
+
+    for subnet in tiers['private']:
+        rtb = subnet_rtb.get(subnet['SubnetId']) or main_rtb
+        nat_id = get_default_target(rtb)[1]
+
+        if nat_id not in nat_names:
+            nat = nats[nat_id]
+            nat_names[nat_id] = names.get(get_name(nat, nat_id))
+            allocation_id = next((a.get('AllocationId') for a in nat.get('NatGatewayAddresses', [])), None)
+            spec_nat.append({
+                'name': nat_names[nat_id],
+                'eip': names.get(eip_names.get(allocation_id) or allocation_id or f'{nat_names[nat_id]}-eip'),
+                'subnet': subnet_names[nat['SubnetId']],
+            })
+
+        # the spec has one route table per private subnet, shared tables are split
+        rtb_name = get_name(rtb, rtb['RouteTableId'])
+
+        if rtb['RouteTableId'] in rtb_names:
+            rtb_name = f'{rtb_name}-{subnet_names[subnet["SubnetId"]]}'
+
+        name = names.get(rtb_name)
+        rtb_names.setdefault(rtb['RouteTableId'], []).append(name)
+        private_rtbs.append({'name': name, 'subnet': subnet_names[subnet['SubnetId']], 'nat': nat_names[nat_id]})
+
+    spec_route_tables = {}
+
+    for tier in ['public', 'protected']:
+        tier_rtbs = {}
+
+        for subnet in tiers[tier]:
+            rtb = subnet_rtb.get(subnet['SubnetId']) or main_rtb
+
+            if rtb:
+                tier_rtbs[rtb['RouteTableId']] = rtb
+
+        if not tiers[tier]:
+            continue
+
+        if len(tier_rtbs) > 1:
+            warnings.append(f'{tier} subnets use {len(tier_rtbs)} route tables, imported as one')
+
+        rtb = next(iter(tier_rtbs.values()), None)
+        name = names.get(get_name(rtb, rtb['RouteTableId']) if rtb else f'{tier}-rt')
+        spec_route_tables[tier] = name
+
+        for rtb_id in tier_rtbs:
+            rtb_names.setdefault(rtb_id, []).append(name)
+
+    if private_rtbs:
+        spec_route_tables['private'] = private_rtbs
+
+    # gateway endpoints of s3 and dynamodb
+    spec_endpoints = {'s3': [], 'dynamodb': []}
+
+    for endpoint in resources.get('endpoints', {}).get(vpc_id, []):
+        service = endpoint['ServiceName'].rsplit('.', 1)[-1]
+
+        if endpoint.get('VpcEndpointType') != 'Gateway' or service not in spec_endpoints:
+            warnings.append(f'{endpoint["VpcEndpointId"]}: {endpoint["ServiceName"]} endpoint is not imported')
+            continue
+
+        for rtb_id in endpoint.get('RouteTableIds', []):
+            for name in rtb_names.get(rtb_id, []):
+                if name not in spec_endpoints[service]:
+                    spec_endpoints[service].append(name)
+
+    spec = {
+        'project': get_tag(vpc, 'project') or get_name(vpc, vpc_id),
+        'region': region,
+        'vpc': {'name': get_name(vpc, vpc_id), 'cidr': vpc['CidrBlock']},
+        'subnets': spec_subnets,
+        'k8s-tags': any(get_tag(subnet, 'kubernetes.io/role/elb') is not None or
+                        get_tag(subnet, 'kubernetes.io/role/internal-elb') is not None for subnet in subnets),
+    }
+
+    if tiers['public']:
+        if not igws:
+            warnings.append('public subnets route to an Internet Gateway of another VPC')
+
+        spec['igw'] = names.get(get_name(igws[0], igws[0]['InternetGatewayId']) if igws else 'igw')
+
+    if spec_nat:
+        spec['nat'] = spec_nat
+
+    spec['route-tables'] = spec_route_tables
+    spec['endpoints'] = spec_endpoints
+
+    # flow logs to cloudwatch logs, the role is created again by the template
+    for flow_log in resources.get('flow_logs', {}).get(vpc_id, []):
+        if flow_log.get('LogDestinationType', 'cloud-watch-logs') == 'cloud-watch-logs' and \
+                flow_log.get('DeliverLogsPermissionArn'):
+            spec['flow-logs'] = {
+                'log-group': flow_log['LogGroupName'],
+                'role-name': flow_log['DeliverLogsPermissionArn'].rsplit('/', 1)[-1],
+            }
+            break
+
+    return spec, warnings
+
+
+def import_vpcs(client, vpc_ids=None, max_workers=MAX_WORKERS):
+    # {vpc id: (spec, warnings)} of the given vpcs or every vpc of the client region
+    resources = fetch_resources(client, vpc_ids, max_workers)
+    grouped = group_by_vpc(resources)
+    region = client.meta.region_name
+
+    return {
+        vpc['VpcId']: build_spec(vpc, grouped, region, resources['addresses'])
+        for vpc in resources['vpcs']
+    }
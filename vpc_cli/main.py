@@ -1,32 +1,471 @@
+import os
 import sys
+import time
 import argparse
 
-from vpc_cli.command import Command
 from vpc_cli import VERSION
+from vpc_cli.timings import timings
+
+# heavy modules (boto3, inquirer, prettytable, pyfiglet, yaml) are imported by each command when it runs,
+# so argument parsing and --version stay fast
 
 
 def get_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument('-p', '--profile', dest='profile', action='store', default='default',
                         help='use aws credential profile.')
+    parser.add_argument('--timings', dest='timings', action='store', choices=['json', 'ndjson'], default=None,
+                        help='report wall time, call count and bytes written of each phase.')
+    parser.add_argument('--timings-file', dest='timings_file', action='store', default=None,
+                        help='append timings report to file instead of stderr.')
+    parser.add_argument('--api-stats', dest='api_stats', action='store_true',
+                        help='report calls, latency, retries and throttles of each AWS API operation.')
+    parser.add_argument('--api-stats-prom', dest='api_stats_prom', action='store', default=None,
+                        help='write AWS API stats to file in Prometheus text format.')
+    parser.add_argument('--table-format', dest='table_format', action='store',
+                        choices=['table', 'json', 'csv', 'ndjson'], default='table',
+                        help='format of summary and deploy result tables. (default: table)')
     parser.add_argument('-v', '--version', action='version', version=f'vpc-cli v{VERSION}')
+    subparsers = parser.add_subparsers(dest='command')
+
+    generate_parser = subparsers.add_parser('generate', help='generate template from spec file without prompts.')
+    generate_parser.add_argument('-s', '--spec', dest='spec', action='store', required=True,
+                                 help='path of vpc spec file.')
+    generate_parser.add_argument('-o', '--output', dest='output', action='store', default='vpc.yaml',
+                                 help='path of generated template file.')
+    generate_parser.add_argument('-f', '--format', dest='format', action='store', choices=['yaml', 'json'],
+                                 default='yaml', help='format of generated template file. (default: yaml)')
+    generate_parser.add_argument('--split', dest='split', action='store', choices=['auto', 'tier', 'az', 'none'],
+                                 default='auto', help='split template into nested stacks by subnet tier or AZ. '
+                                                      '(default: auto, by tier when over CloudFormation limits)')
+    generate_parser.add_argument('--bucket', dest='bucket', action='store', default=None,
+                                 help='S3 bucket to upload nested stack templates to.')
+    generate_parser.add_argument('--bucket-prefix', dest='bucket_prefix', action='store', default='',
+                                 help='key prefix of uploaded nested stack templates.')
+    generate_parser.add_argument('--no-cache', dest='cache', action='store_false',
+                                 help='build template even when the same spec is in the template cache.')
+    generate_parser.add_argument('--s3-endpoint-url', dest='s3_endpoint_url', action='store', default=None,
+                                 help='S3 endpoint url, e.g. local S3 compatible server.')
+
+    check_parser = subparsers.add_parser('check', help='check references, dependencies, CIDRs and AZs of templates.')
+    check_parser.add_argument('templates', nargs='+', help='paths of template files.')
+    check_parser.add_argument('-r', '--region', dest='region', action='store', default=None,
+                              help='region the templates are deployed to, AZs are checked against it.')
+
+    import_parser = subparsers.add_parser('import', help='import existing VPCs into spec and template files.')
+    import_parser.add_argument('-r', '--region', dest='region', action='store', required=True,
+                               help='region of the VPCs.')
+    import_parser.add_argument('--vpc-id', dest='vpc_ids', action='append', default=None,
+                               help='VPC to import, can be repeated. (default: every VPC of the region)')
+    import_parser.add_argument('-o', '--output-dir', dest='output_dir', action='store', default='.',
+                               help='directory of spec and template files. (default: .)')
+    import_parser.add_argument('-f', '--format', dest='format', action='store', choices=['yaml', 'json'],
+                               default='yaml', help='format of template files. (default: yaml)')
+
+    fleet_parser = subparsers.add_parser('fleet', help='generate templates from manifest of spec files in parallel.')
+    fleet_parser.add_argument('-m', '--manifest', dest='manifest', action='store', required=True,
+                              help='path of manifest file listing spec files.')
+    fleet_parser.add_argument('-o', '--output-dir', dest='output_dir', action='store', default=None,
+                              help='directory of generated template files.')
+    fleet_parser.add_argument('-j', '--jobs', dest='jobs', action='store', type=int, default=None,
+                              help='number of worker processes. (default: cpu count)')
+    fleet_parser.add_argument('-f', '--format', dest='format', action='store', choices=['yaml', 'json'],
+                              default='yaml', help='format of generated template files. (default: yaml)')
+    fleet_parser.add_argument('--no-cache', dest='cache', action='store_false',
+                              help='build templates even when the same spec is in the template cache.')
+
+    deploy_parser = subparsers.add_parser('deploy', help='deploy many templates across regions concurrently.')
+    deploy_parser.add_argument('-m', '--manifest', dest='manifest', action='store', required=True,
+                               help='path of manifest file listing templates, stack names and regions.')
+    deploy_parser.add_argument('-c', '--max-concurrency', dest='max_concurrency', action='store', type=int,
+                               default=20, help='maximum number of stacks deployed at once. (default: 20)')
+    deploy_parser.add_argument('-r', '--region-rate', dest='region_rate', action='store', type=float, default=2,
+                               help='maximum CloudFormation API calls per second per region. (default: 2)')
+
+    capacity_parser = subparsers.add_parser('capacity', help='report usable IPs per subnet, tier and AZ of specs.')
+    capacity_parser.add_argument('specs', nargs='+', help='paths of vpc spec files.')
+    capacity_parser.add_argument('--subnets', dest='subnets', action='store_true',
+                                 help='report every subnet, not only tiers, AZs and VPCs.')
+
+    conflicts_parser = subparsers.add_parser('conflicts', help='find overlapping CIDRs of VPCs in specs, templates '
+                                                               'and AWS regions.')
+    conflicts_parser.add_argument('paths', nargs='*', help='paths of vpc spec or template files.')
+    conflicts_parser.add_argument('-r', '--region', dest='regions', action='append', default=None,
+                                  help='include existing VPCs of region, can be repeated.')
+
+    resources_parser = subparsers.add_parser('resources', help='list resources of many stacks concurrently.')
+    resources_parser.add_argument('stacks', nargs='+', help='stack names, [region/]stack-name.')
+    resources_parser.add_argument('-r', '--region', dest='region', action='store', default=None,
+                                  help='region of stacks given without region.')
+    resources_parser.add_argument('-j', '--jobs', dest='jobs', action='store', type=int, default=8,
+                                  help='number of stacks listed at once. (default: 8)')
+    resources_parser.add_argument('--output-file', dest='output_file', action='store', default=None,
+                                  help='write resources to file as they are listed instead of stdout.')
 
     args = parser.parse_args()
-    profile = args.profile
 
-    return {'profile': profile}
+    return vars(args)
+
+
+def generate(spec_path, output, output_format='yaml', split='auto', profile='default', bucket=None, bucket_prefix='',
+             s3_endpoint_url=None, cache=True, table_format='table'):
+    from vpc_cli.check import check_template
+    from vpc_cli.create_yaml import CreateYAML
+    from vpc_cli.nested import needs_split, split_template, upload_children, write_nested
+    from vpc_cli.spec import SpecError, load_spec, parse_spec
+    from vpc_cli.template_cache import check_body, get_key, template_cache
+
+    try:
+        spec = load_spec(spec_path)
+
+    except (OSError, SpecError) as e:
+        print(f'{spec_path}: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    # the spec is validated even when its template is cached
+    try:
+        with timings.phase('generate.parse_spec'):
+            options = parse_spec(spec, profile)
+
+    except (OSError, SpecError) as e:
+        print(f'{spec_path}: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    # only single templates are cached, the key includes a hash of the generator source
+    cache = cache and split in ('auto', 'none')
+    key = get_key(spec, output_format)
+    body = template_cache.get(key, output_format) if cache else None
+
+    if body is not None:
+        # cached templates are checked again, a template which fails is built again
+        with timings.phase('generate.check'):
+            errors = check_body(body, options['region'])
+
+        if not errors:
+            with open(output, 'w') as f:
+                timings.add_bytes('generate.cache_hit', f.write(body))
+
+            print_generated(output, spec, profile, table_format, options)
+            return
+
+    yaml_file = CreateYAML(**options, output=None, output_format=output_format)
+    template = yaml_file.get_template()
+
+    with timings.phase('generate.check'):
+        errors = check_template(template, options['region'])
+
+    if errors:
+        for error in errors:
+            print(f'{spec_path}: {error}', file=sys.stderr)
+
+        sys.exit(1)
+
+    if split == 'auto':
+        split = 'tier' if needs_split(template, output_format) else 'none'
+
+    if split == 'none':
+        yaml_file.output = output
+
+        if not yaml_file.create_yaml():
+            sys.exit(1)
+
+        if cache:
+            with open(output) as f:
+                template_cache.put(key, f.read(), output_format)
+
+    else:  # nested stacks, children can be created in parallel by cloudformation
+        try:
+            parent, children = split_template(template, split, output_format=output_format)
+
+        except ValueError as e:
+            print(f'{spec_path}: {e}', file=sys.stderr)
+            sys.exit(1)
+
+        if bucket:
+            from vpc_cli.aws import aws_clients
+
+            session = aws_clients.get_session(profile, options['region'])
+            upload_children(parent, children, session, bucket, bucket_prefix, s3_endpoint_url, output_format)
+
+        write_nested(parent, children, output, output_format)
+
+    print_generated(output, spec, profile, table_format, options)
+
+
+def print_generated(output, spec, profile='default', table_format='table', options=None):
+    # path of the template, or summary of the spec for other tools
+    if table_format == 'table':
+        print(output)
+        return
+
+    from vpc_cli.print_table import PrintTable
+    from vpc_cli.spec import parse_spec
+
+    PrintTable(table_format).print_summary(**(options or parse_spec(spec, profile)))
+
+
+def check(template_paths, region=None):
+    import yaml
+
+    from vpc_cli.check import check_template, load_template
+
+    failed = 0
+
+    for path in template_paths:
+        try:
+            errors = check_template(load_template(path), region)
+
+        except (OSError, yaml.YAMLError) as e:
+            errors = [str(e)]
+
+        for error in errors:
+            print(f'{path}: {error}', file=sys.stderr)
+
+        failed += bool(errors)
+
+    print(f'{len(template_paths) - failed} passed, {failed} failed')
+
+    if failed:
+        sys.exit(1)
+
+
+def import_vpc(region, vpc_ids=None, output_dir='.', output_format='yaml', profile='default'):
+    import yaml
+
+    from vpc_cli.aws import aws_clients
+    from vpc_cli.create_yaml import CreateYAML
+    from vpc_cli.importer import import_vpcs
+    from vpc_cli.spec import SpecError, parse_spec
+
+    imported = import_vpcs(aws_clients.get_client('ec2', profile, region), vpc_ids)
+    failed = 0
+    os.makedirs(output_dir, exist_ok=True)
+
+    for vpc_id, (spec, warnings) in imported.items():
+        spec_path = os.path.join(output_dir, f'{vpc_id}.spec.yml')
+
+        with open(spec_path, 'w') as f:
+            yaml.safe_dump(spec, f, sort_keys=False)
+
+        for warning in warnings:
+            print(f'{vpc_id}: {warning}', file=sys.stderr)
+
+        try:
+            options = parse_spec(spec, profile)
+
+        except SpecError as e:
+            print(f'{spec_path}: {e}', file=sys.stderr)
+            failed += 1
+            continue
+
+        output = os.path.join(output_dir, f'{vpc_id}.{output_format}')
+        CreateYAML(**options, output=output, output_format=output_format)
+        print(f'{spec_path} {output}')
+
+    print(f'{len(imported) - failed} imported, {failed} failed')
+
+    if failed:
+        sys.exit(1)
+
+
+def fleet(manifest_path, output_dir=None, jobs=None, output_format='yaml', cache=True, table_format='table'):
+    from vpc_cli.fleet import load_manifest, generate_fleet, print_summary
+    from vpc_cli.spec import SpecError
+
+    try:
+        entries = load_manifest(manifest_path, output_dir, output_format, cache)
+
+    except (OSError, SpecError) as e:
+        print(f'{manifest_path}: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = generate_fleet(entries, jobs)
+
+    if print_summary(results, time.perf_counter() - start, table_format):
+        sys.exit(1)
+
+
+def deploy(manifest_path, profile='default', max_concurrency=20, region_rate=2, table_format='table'):
+    from vpc_cli.scheduler import DeployScheduler, load_deployments
+    from vpc_cli.spec import SpecError
+
+    try:
+        deployments = load_deployments(manifest_path, profile)
+
+    except (OSError, SpecError) as e:
+        print(f'{manifest_path}: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    if DeployScheduler(deployments, max_concurrency, region_rate, table_format).run():
+        sys.exit(1)
+
+
+def capacity(spec_paths, subnets=False, profile='default', table_format='table'):
+    from vpc_cli.capacity import CapacityPlan
+    from vpc_cli.print_table import PrintTable
+    from vpc_cli.spec import SpecError, load_spec, parse_spec
+
+    vpcs = []
+    failed = 0
+
+    for path in spec_paths:
+        try:
+            vpcs.append(parse_spec(load_spec(path), profile))
+
+        except (OSError, SpecError) as e:
+            print(f'{path}: {e}', file=sys.stderr)
+            failed += 1
+
+    with timings.phase('capacity.plan'):
+        plan = CapacityPlan(vpcs)
+
+    with PrintTable(table_format) as print_table:
+        print_table.print_capacity(plan, subnets)
+
+    if failed:
+        sys.exit(1)
+
+
+def conflicts(paths, regions=None, profile='default', table_format='table'):
+    import yaml
+
+    from vpc_cli.conflicts import CONFLICT_FIELDS, check_blocks, describe_region_blocks, find_conflicts, \
+        get_file_blocks
+    from vpc_cli.print_table import PrintTable
+
+    if not paths and not regions:
+        print('spec or template paths, or --region is required', file=sys.stderr)
+        sys.exit(1)
+
+    blocks = []
+    failed = 0
+
+    for path in paths:
+        try:
+            blocks.extend(check_blocks(get_file_blocks(path)))
+
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f'{path}: {e}', file=sys.stderr)
+            failed += 1
+
+    if regions:
+        from vpc_cli.aws import aws_clients
+
+        clients = [aws_clients.get_client('ec2', profile, region) for region in regions]
+        blocks.extend(describe_region_blocks(clients))
+
+    with timings.phase('conflicts.find'):
+        rows = list(find_conflicts(blocks))
+
+    with PrintTable(table_format) as print_table:
+        print_table.write('CIDR Conflicts', CONFLICT_FIELDS, rows)
+
+    print(f'{len(blocks)} CIDR blocks, {len(rows)} conflicts', file=sys.stderr)
+
+    if failed or rows:
+        sys.exit(1)
+
+
+def resources(stacks, region=None, profile='default', jobs=8, output_file=None, table_format='table'):
+    from vpc_cli.resources import parse_stacks, print_resources
+
+    try:
+        stacks = parse_stacks(stacks, region)
+
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    if output_file:
+        # line buffered, every row is on disk as soon as it is written
+        with open(output_file, 'w', buffering=1) as f:
+            failed = print_resources(stacks, profile, jobs, table_format, f)
+
+    else:
+        failed = print_resources(stacks, profile, jobs, table_format)
+
+    if failed:
+        sys.exit(1)
+
+
+def write_timings(output_format, path=None):
+    if path:
+        with open(path, 'a') as f:
+            timings.write(f, output_format)
+
+    else:
+        timings.write(sys.stderr, output_format)
+
+
+def write_api_stats(summary=True, prometheus_path=None):
+    from vpc_cli.api_stats import api_stats
+
+    if summary:
+        api_stats.print_summary()
+
+    if prometheus_path:
+        api_stats.write_prometheus(prometheus_path)
 
 
 def main():
+    options = get_arguments()
+
+    if options['timings']:
+        timings.enable(options['command'])
+
+    if options['api_stats'] or options['api_stats_prom']:
+        from vpc_cli.api_stats import api_stats
+
+        api_stats.enable()
+
     try:
-        options = get_arguments()
+        if options['command'] == 'generate':
+            generate(options['spec'], options['output'], options['format'], options['split'], options['profile'],
+                     options['bucket'], options['bucket_prefix'], options['s3_endpoint_url'], options['cache'],
+                     options['table_format'])
+
+        elif options['command'] == 'check':
+            check(options['templates'], options['region'])
+
+        elif options['command'] == 'import':
+            import_vpc(options['region'], options['vpc_ids'], options['output_dir'], options['format'],
+                       options['profile'])
+
+        elif options['command'] == 'fleet':
+            fleet(options['manifest'], options['output_dir'], options['jobs'], options['format'], options['cache'],
+                  options['table_format'])
 
-        Command(options['profile'])
+        elif options['command'] == 'deploy':
+            deploy(options['manifest'], options['profile'], options['max_concurrency'], options['region_rate'],
+                   options['table_format'])
+
+        elif options['command'] == 'capacity':
+            capacity(options['specs'], options['subnets'], options['profile'], options['table_format'])
+
+        elif options['command'] == 'conflicts':
+            conflicts(options['paths'], options['regions'], options['profile'], options['table_format'])
+
+        elif options['command'] == 'resources':
+            resources(options['stacks'], options['region'], options['profile'], options['jobs'],
+                      options['output_file'], options['table_format'])
+
+        else:
+            from vpc_cli.command import Command
+
+            Command(options['profile'], options['table_format'])
 
     except KeyboardInterrupt:
         print('Cancelled by user.')
         sys.exit()
 
+    finally:
+        if options['timings']:
+            write_timings(options['timings'], options['timings_file'])
+
+        if options['api_stats'] or options['api_stats_prom']:
+            write_api_stats(options['api_stats'], options['api_stats_prom'])
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,421 @@
+import io
+import os
+import re
+import hashlib
+
+from vpc_cli.create_yaml import dump_template
+from vpc_cli.timings import timed, timings
+
+INLINE_TEMPLATE_LIMIT = 51200  # TemplateBody
+URL_TEMPLATE_LIMIT = 1024000  # TemplateURL
+RESOURCE_LIMIT = 500
+CHILD_RESOURCE_LIMIT = 200
+PARAMETER_LIMIT = 200
+OUTPUT_LIMIT = 200
+
+
+def template_body(template, output_format='yaml'):
+    stream = io.StringIO()
+    dump_template(template, stream, output_format)
+
+    return stream.getvalue()
+
+
+def needs_split(template, output_format='yaml'):
+    return len(template['Resources']) > RESOURCE_LIMIT or \
+        len(template_body(template, output_format).encode()) > INLINE_TEMPLATE_LIMIT
+
+
+def get_att_target(target):
+    # (logical id, attribute) of Fn::GetAtt, 'Name.Attribute' or [Name, Attribute], None when malformed
+    if isinstance(target, str):
+        target = target.split('.', 1)
+
+    if isinstance(target, list) and len(target) == 2 and isinstance(target[0], str) and target[0] and target[1]:
+        return target[0], target[1]
+
+    return None
+
+
+def find_refs(value, refs=None, errors=None):
+    # logical ids used by Ref and Fn::GetAtt, as (logical id, attribute or None),
+    # malformed functions are skipped and reported to errors when it is given
+    refs = [] if refs is None else refs
+
+    if isinstance(value, dict):
+        if 'Ref' in value and len(value) == 1:
+            if isinstance(value['Ref'], str):
+                refs.append((value['Ref'], None))
+
+            elif errors is not None:
+                errors.append(f'Ref {value["Ref"]} must be a logical id')
+
+        elif 'Fn::GetAtt' in value and len(value) == 1:
+            target = get_att_target(value['Fn::GetAtt'])
+
+            if target:
+                refs.append(target)
+
+            elif errors is not None:
+                errors.append(f'Fn::GetAtt {value["Fn::GetAtt"]} must be a logical id and an attribute')
+
+        else:
+            for item in value.values():
+                find_refs(item, refs, errors)
+
+    elif isinstance(value, list):
+        for item in value:
+            find_refs(item, refs, errors)
+
+    return refs
+
+
+def replace_refs(value, replace):
+    # replace(logical id, attribute or None) returns new expression or None to keep
+    if isinstance(value, dict):
+        refs = find_refs(value) if len(value) == 1 and ('Ref' in value or 'Fn::GetAtt' in value) else None
+
+        if refs:
+            return replace(*refs[0]) or value
+
+        return {key: replace_refs(item, replace) for key, item in value.items()}
+
+    elif isinstance(value, list):
+        return [replace_refs(item, replace) for item in value]
+
+    return value
+
+
+def get_depends_on(resource):
+    depends_on = resource.get('DependsOn', [])
+
+    return [depends_on] if isinstance(depends_on, str) else list(depends_on)
+
+
+def assign_units(resources):
+    # every child resource belongs to one subnet (unit), everything else stays in the parent
+    units = {}
+    subnets = [logical_id for logical_id, r in resources.items() if r['Type'] == 'AWS::EC2::Subnet']
+    associations = {}
+
+    for logical_id in subnets:
+        units[logical_id] = logical_id
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] == 'AWS::EC2::SubnetRouteTableAssociation':
+            subnet = resource['Properties']['SubnetId']['Ref']
+            units[logical_id] = subnet
+            associations.setdefault(resource['Properties']['RouteTableId']['Ref'], []).append(subnet)
+
+    # route table with only one subnet goes with the subnet
+    for rtb, rtb_subnets in associations.items():
+        if len(rtb_subnets) == 1:
+            units[rtb] = rtb_subnets[0]
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] == 'AWS::EC2::NatGateway':
+            units[logical_id] = resource['Properties']['SubnetId']['Ref']
+
+            for target, _ in find_refs(resource['Properties']['AllocationId']):
+                units[target] = units[logical_id]
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] == 'AWS::EC2::Route':
+            rtb = resource['Properties']['RouteTableId']['Ref']
+
+            if rtb in units:
+                units[logical_id] = units[rtb]
+
+            elif 'NatGatewayId' in resource['Properties']:
+                units[logical_id] = units[resource['Properties']['NatGatewayId']['Ref']]
+
+    return units
+
+
+def reaches(graph, start, goal):
+    # whether goal can be reached from start in {node: set of nodes}
+    stack = [start]
+    seen = {start}
+
+    while stack:
+        node = stack.pop()
+
+        if node == goal:
+            return True
+
+        for other in graph.get(node, ()):
+            if other not in seen:
+                seen.add(other)
+                stack.append(other)
+
+    return False
+
+
+def check_limits(parent, children, output_format='yaml'):
+    # errors of the parent and children over cloudformation limits, every template can be read from s3
+    errors = []
+
+    for name, template in [('parent', parent)] + list(children.items()):
+        size = len(template_body(template, output_format).encode())
+
+        if len(template['Resources']) > RESOURCE_LIMIT:
+            errors.append(f'{name}: {len(template["Resources"])} resources, limit is {RESOURCE_LIMIT}')
+
+        if size > URL_TEMPLATE_LIMIT:
+            errors.append(f'{name}: {size} bytes, limit is {URL_TEMPLATE_LIMIT}')
+
+        if len(template.get('Parameters') or {}) > PARAMETER_LIMIT:
+            errors.append(f'{name}: {len(template["Parameters"])} parameters, limit is {PARAMETER_LIMIT}')
+
+        if len(template.get('Outputs') or {}) > OUTPUT_LIMIT:
+            errors.append(f'{name}: {len(template["Outputs"])} outputs, limit is {OUTPUT_LIMIT}')
+
+    return errors
+
+
+@timed('template.split')
+def split_template(template, strategy='tier', max_resources=CHILD_RESOURCE_LIMIT, output_format='yaml'):
+    # returns parent template and {child logical id: child template},
+    # raises ValueError when they can not be deployed
+    resources = template['Resources']
+    units = assign_units(resources)
+
+    # group subnets by tier or az, then pack them into children of max_resources
+    unit_resources = {}
+
+    for logical_id, unit in units.items():
+        unit_resources.setdefault(unit, []).append(logical_id)
+
+    groups = {}
+
+    for logical_id, resource in resources.items():
+        if resource['Type'] != 'AWS::EC2::Subnet':
+            continue
+
+        if strategy == 'az':
+            az = resource['Properties']['AvailabilityZone']
+            key = ''.join(part.capitalize() for part in re.split(r'[^a-zA-Z0-9]+', az))
+
+        else:
+            key = re.match(r'[A-Z][a-z]+', logical_id).group(0)
+
+        groups.setdefault(key, []).append(logical_id)
+
+    stack_of = {}
+
+    for key, subnets in groups.items():
+        index = 0
+        count = 0
+
+        for subnet in subnets:
+            size = len(unit_resources[subnet])
+
+            if count and count + size > max_resources:
+                index += 1
+                count = 0
+
+            for logical_id in unit_resources[subnet]:
+                stack_of[logical_id] = f'{key}Stack{index}'
+
+            count += size
+
+    # routes to a nat gateway of another child go with their route table and read it through a parameter,
+    # unless the two children would depend on each other, e.g. nat gateways of every az in az children
+    stack_graph = {}
+    nat_routes = []
+
+    for logical_id, resource in resources.items():
+        stack = stack_of.get(logical_id)
+
+        if stack is None:
+            continue
+
+        if resource['Type'] == 'AWS::EC2::Route' and 'NatGatewayId' in resource['Properties']:
+            nat_routes.append(logical_id)
+            continue
+
+        for target in [target for target, _ in find_refs(resource)] + get_depends_on(resource):
+            if stack_of.get(target, stack) != stack:
+                stack_graph.setdefault(stack, set()).add(stack_of[target])
+
+    for logical_id in nat_routes:
+        stack = stack_of[logical_id]
+        nat_stack = stack_of.get(resources[logical_id]['Properties']['NatGatewayId']['Ref'], stack)
+
+        if nat_stack == stack or nat_stack in stack_graph.get(stack, ()):
+            continue
+
+        if reaches(stack_graph, nat_stack, stack):
+            del stack_of[logical_id]
+
+        else:
+            stack_graph.setdefault(stack, set()).add(nat_stack)
+
+    children = {}
+
+    for logical_id, stack in stack_of.items():
+        children.setdefault(stack, {
+            'AWSTemplateFormatVersion': template['AWSTemplateFormatVersion'],
+            'Description': f'{template.get("Description", "")} ({stack})',
+            'Parameters': {},
+            'Resources': {},
+            'Outputs': {},
+        })
+
+    # parent resources which read children outputs are listed after the nested stacks
+    parent_resources = {}
+    after_stacks = {}
+    stack_params = {stack: {} for stack in children}
+    stack_depends_on = {stack: set() for stack in children}
+
+    def export(target, attribute):
+        # expression to read target from the parent template
+        name = target + (attribute or '')
+        stack = stack_of.get(target)
+
+        if stack is None:
+            return {'Ref': target} if attribute is None else {'Fn::GetAtt': [target, attribute]}
+
+        children[stack]['Outputs'][name] = {
+            'Value': {'Ref': target} if attribute is None else {'Fn::GetAtt': [target, attribute]}
+        }
+
+        return {'Fn::GetAtt': [stack, f'Outputs.{name}']}
+
+    for logical_id, resource in resources.items():
+        stack = stack_of.get(logical_id)
+
+        if stack is None:  # parent resource, references to children go through outputs
+            resource = replace_refs(resource, lambda target, attribute: export(target, attribute)
+                                    if target in stack_of else None)
+            depends_on = [stack_of.get(d, d) for d in get_depends_on(resource)]
+
+            if depends_on:
+                resource = dict(resource, DependsOn=sorted(set(depends_on)))
+
+            if any(target in stack_of for target, _ in find_refs(resources[logical_id])) or \
+                    any(d in children for d in depends_on):
+                after_stacks[logical_id] = resource
+
+            else:
+                parent_resources[logical_id] = resource
+
+            continue
+
+        def to_parameter(target, attribute, stack=stack):
+            if target in resources and stack_of.get(target) != stack:
+                name = target + (attribute or '')
+                children[stack]['Parameters'][name] = {'Type': 'String'}
+                stack_params[stack][name] = export(target, attribute)
+
+                if target in stack_of:
+                    stack_depends_on[stack].add(stack_of[target])
+
+                return {'Ref': name}
+
+            return None
+
+        resource = replace_refs(resource, to_parameter)
+        depends_on = get_depends_on(resource)
+        inner = [d for d in depends_on if stack_of.get(d) == stack]
+
+        for d in depends_on:
+            if d not in inner:
+                stack_depends_on[stack].add(stack_of.get(d, d))
+
+        resource = {key: value for key, value in resource.items() if key != 'DependsOn'}
+
+        if inner:
+            resource['DependsOn'] = inner if len(inner) > 1 else inner[0]
+
+        children[stack]['Resources'][logical_id] = resource
+
+    for stack, child in children.items():
+        if not child['Parameters']:
+            del child['Parameters']
+
+        if not child['Outputs']:
+            del child['Outputs']
+
+        parent_resources[stack] = {
+            'Type': 'AWS::CloudFormation::Stack',
+            'Properties': {
+                'TemplateURL': f'{stack}.yaml',
+                'Parameters': stack_params[stack],
+                'TimeoutInMinutes': 15,
+            }
+        }
+
+        if stack_depends_on[stack]:
+            parent_resources[stack]['DependsOn'] = sorted(stack_depends_on[stack] - {stack})
+
+        if not stack_params[stack]:
+            del parent_resources[stack]['Properties']['Parameters']
+
+    parent = {key: value for key, value in template.items() if key != 'Resources'}
+    parent['Resources'] = dict(parent_resources, **after_stacks)
+    errors = check_limits(parent, children, output_format)
+
+    if errors:
+        raise ValueError(', '.join(errors))
+
+    return parent, children
+
+
+def child_path(output, stack, output_format='yaml'):
+    stem, _ = os.path.splitext(output)
+
+    return f'{stem}-{stack}.{output_format}'
+
+
+@timed('deploy.upload_template')
+def upload_template(session, bucket, body, prefix='', endpoint_url=None):
+    # content addressed key, uploading the same template twice is a no-op for cloudformation
+    from vpc_cli.aws import aws_clients
+
+    client = aws_clients.get_client('s3', session.profile_name, session.region_name, endpoint_url)
+    key = f'{prefix}{hashlib.sha256(body.encode()).hexdigest()}.template'
+    client.put_object(Bucket=bucket, Key=key, Body=body.encode())
+
+    if endpoint_url:
+        return f'{endpoint_url.rstrip("/")}/{bucket}/{key}'
+
+    return f'https://{bucket}.s3.{session.region_name}.amazonaws.com/{key}'
+
+
+def upload_children(parent, children, session, bucket, prefix='', endpoint_url=None, output_format='yaml'):
+    for stack, child in children.items():
+        url = upload_template(session, bucket, template_body(child, output_format), prefix, endpoint_url)
+        parent['Resources'][stack]['Properties']['TemplateURL'] = url
+
+
+@timed('template.write_nested')
+def write_nested(parent, children, output, output_format='yaml'):
+    # children which are not uploaded are written next to output with relative TemplateURL,
+    # `aws cloudformation package` can upload them
+    for stack, child in children.items():
+        properties = parent['Resources'][stack]['Properties']
+
+        if not properties['TemplateURL'].startswith(('https://', 'http://')):
+            path = child_path(output, stack, output_format)
+            properties['TemplateURL'] = os.path.basename(path)
+
+            with open(path, 'w') as f:
+                timings.add_bytes('template.write_nested', f.write(template_body(child, output_format)))
+
+    with open(output, 'w') as f:
+        timings.add_bytes('template.write_nested', f.write(template_body(parent, output_format)))
+
+
+def template_source(session, body, bucket=None, prefix='', endpoint_url=None):
+    # create_stack/create_change_set arguments for the template body
+    if len(body.encode()) <= INLINE_TEMPLATE_LIMIT:
+        return {'TemplateBody': body}
+
+    if not bucket:
+        raise ValueError(f'template is larger than {INLINE_TEMPLATE_LIMIT} bytes, S3 bucket is required')
+
+    if len(body.encode()) > URL_TEMPLATE_LIMIT:
+        raise ValueError(f'template is larger than {URL_TEMPLATE_LIMIT} bytes, split it into nested stacks')
+
+    return {'TemplateURL': upload_template(session, bucket, body, prefix, endpoint_url)}
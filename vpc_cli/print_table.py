@@ -1,21 +1,187 @@
+import re
+import csv
+import sys
+import json
+
 from prettytable import PrettyTable
 
+from vpc_cli.capacity import CapacityPlan
+
+TABLE_FORMATS = ['table', 'json', 'csv', 'ndjson']
+
+
+def get_key(field_name):
+    # 'Route Table' -> 'route_table', 'Time (ms)' -> 'time_ms'
+    return re.sub(r'[^a-z0-9]+', '_', field_name.lower()).strip('_')
+
+
+# row writers stream every row as soon as it is made, nothing is buffered per table
+
+class JsonWriter:
+    # one object of tables, {"subnets": [{"az": ..., "name": ...}, ...], ...}
+    stream = None
+    tables = 0
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write_table(self, title, field_names, rows):
+        keys = [get_key(field_name) for field_name in field_names]
+        self.stream.write(f'{"," if self.tables else "{"}\n  {json.dumps(get_key(title))}: [')
+
+        self.tables += 1
+
+        # the table is closed even when a row fails, so the document stays valid json
+        try:
+            for i, row in enumerate(rows):
+                self.stream.write(f'{"," if i else ""}\n    {json.dumps(dict(zip(keys, row)), default=str)}')
+
+        finally:
+            self.stream.write('\n  ]')
+
+    def close(self):
+        self.stream.write('\n}\n' if self.tables else '{}\n')
+        self.stream.flush()
+
+
+class NdjsonWriter:
+    # one object per row, the table it belongs to is in the table key
+    stream = None
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write_table(self, title, field_names, rows):
+        keys = [get_key(field_name) for field_name in field_names]
+        table = get_key(title)
+
+        for row in rows:
+            self.stream.write(json.dumps({'table': table, **dict(zip(keys, row))}, default=str) + '\n')
+
+    def close(self):
+        self.stream.flush()
+
+
+class CsvWriter:
+    # header row per table, first column is the table every row belongs to
+    writer = None
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+
+    def write_table(self, title, field_names, rows):
+        table = get_key(title)
+        self.writer.writerow(['table'] + [get_key(field_name) for field_name in field_names])
+
+        for row in rows:
+            self.writer.writerow([table] + [' '.join(value) if isinstance(value, list) else value for value in row])
+
+    def close(self):
+        self.stream.flush()
+
+
+WRITERS = {
+    'json': JsonWriter,
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+}
+
+
+def get_writer(table_format, stream=None):
+    return WRITERS[table_format](stream or sys.stdout)
+
+
+def get_table(title=None, field_names=None):
+    table = PrettyTable()
+    table.set_style(15)
+    table.field_names = field_names or []
+
+    if title:
+        table.title = title
+
+    return table
+
 
 class PrintTable:
     table = None
+    writer = None
 
-    def __init__(self):
+    def __init__(self, table_format='table', stream=None):
         self.table = PrettyTable()
         self.table.set_style(15)
+        self.stream = stream
+
+        if table_format != 'table':
+            self.writer = get_writer(table_format, stream)
+
+    def write(self, title, field_names, rows, table=None):
+        # rows are any iterable, machine readable formats consume it one row at a time
+        if self.writer:
+            self.writer.write_table(title, field_names, rows)
+            return
+
+        if table is None:
+            table = self.table
+            table.clear()
+            table.title = title
+
+        if not table.field_names:
+            table.field_names = field_names
+
+        for row in rows:
+            table.add_row(['\n'.join(value) if isinstance(value, list) else value for value in row])
+
+        print(table, file=self.stream)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+    # with PrintTable(...) as print_table, the writer is closed even when a table fails
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def print_summary(
+            self,
+            region,
+            vpc,
+            public_subnet=None,
+            private_subnet=None,
+            protected_subnet=None,
+            igw=None,
+            public_rtb=None,
+            private_rtb=None,
+            protected_rtb=None,
+            nat=None,
+            s3_gateway_ep=None,
+            dynamodb_gateway_ep=None,
+            flow_logs=None,
+            **kwargs
+    ):
+        # every table of the vpc, keyword arguments are the same as CreateYAML
+        with self:
+            self.print_vpc(region, vpc)
+            self.print_subnets(public_subnet, private_subnet, protected_subnet, public_rtb, private_rtb, protected_rtb)
+            self.print_route_tables(public_rtb, private_rtb, protected_rtb, igw)
+            self.print_igw(igw)
+            self.print_nat(nat)
+            self.print_ep(s3_gateway_ep, dynamodb_gateway_ep)
+            self.print_flow_logs(flow_logs)
+            self.print_capacity(CapacityPlan([{
+                'vpc': vpc,
+                'public_subnet': public_subnet,
+                'private_subnet': private_subnet,
+                'protected_subnet': protected_subnet,
+            }]))
 
     def print_vpc(self, region, vpc):
-        self.table.clear()
-        self.table.title = 'VPC'
-        self.table.field_names = ['Region', 'Name', 'CIDR']
-        self.table.add_row([region, vpc['name'], vpc['cidr']])
-        print(self.table)
+        self.write('VPC', ['Region', 'Name', 'CIDR'], [[region, vpc['name'], vpc['cidr']]])
 
-    def print_subnets(
+    def get_subnet_rows(
             self,
             public_subnet=None,
             private_subnet=None,
@@ -24,107 +190,96 @@ class PrintTable:
             private_rtb=None,
             protected_rtb=None
     ):
-        self.table.clear()
-        self.table.title = 'Subnets'
-        self.table.field_names = ['AZ', 'Name', 'CIDR', 'Route Table']
+        # private subnets have their own route tables, looked up by subnet name
+        private_rtb_names = {rtb['subnet']: rtb['name'] for rtb in private_rtb or []}
 
-        if public_subnet:
-            for subnet in public_subnet:
-                self.table.add_row([subnet['az'], subnet['name'], subnet['cidr'], public_rtb])
+        for subnet in public_subnet or []:
+            yield [subnet['az'], subnet['name'], subnet['cidr'], public_rtb]
 
-        if private_subnet:
-            for subnet in private_subnet:
-                route_table_name = next((item for item in private_rtb if item['subnet'] == subnet['name']))['name']
-                self.table.add_row([subnet['az'], subnet['name'], subnet['cidr'], route_table_name])
+        for subnet in private_subnet or []:
+            yield [subnet['az'], subnet['name'], subnet['cidr'], private_rtb_names[subnet['name']]]
 
-        if protected_subnet:
-            for subnet in protected_subnet:
-                self.table.add_row([subnet['az'], subnet['name'], subnet['cidr'], protected_rtb])
+        for subnet in protected_subnet or []:
+            yield [subnet['az'], subnet['name'], subnet['cidr'], protected_rtb]
 
-        print(self.table)
+    def print_subnets(
+            self,
+            public_subnet=None,
+            private_subnet=None,
+            protected_subnet=None,
+            public_rtb=None,
+            private_rtb=None,
+            protected_rtb=None
+    ):
+        rows = self.get_subnet_rows(public_subnet, private_subnet, protected_subnet,
+                                    public_rtb, private_rtb, protected_rtb)
+        self.write('Subnets', ['AZ', 'Name', 'CIDR', 'Route Table'], rows)
 
-    def print_route_tables(
+    def get_route_table_rows(
             self,
             public_rtb=None,
             private_rtb=None,
             protected_rtb=None,
             igw=None
     ):
-        self.table.clear()
-        self.table.title = 'Route Tables'
-        self.table.field_names = ['Type', 'Name', 'Gateway']
-
         if public_rtb:
-            self.table.add_row(['Public', public_rtb, igw])
+            yield ['Public', public_rtb, igw]
 
-        if private_rtb:
-            for rtb in private_rtb:
-                self.table.add_row(['Private', rtb['name'], rtb['nat']])
+        for rtb in private_rtb or []:
+            # private route tables have no nat gateway when there is no public subnet
+            yield ['Private', rtb['name'], rtb.get('nat')]
 
         if protected_rtb:
-            self.table.add_row(['Protected', protected_rtb, 'None'])
+            yield ['Protected', protected_rtb, None]
 
-        print(self.table)
+    def print_route_tables(
+            self,
+            public_rtb=None,
+            private_rtb=None,
+            protected_rtb=None,
+            igw=None
+    ):
+        rows = self.get_route_table_rows(public_rtb, private_rtb, protected_rtb, igw)
+        self.write('Route Tables', ['Type', 'Name', 'Gateway'], rows)
 
     def print_igw(
             self,
-            igw='None'
+            igw=None
     ):
-        self.table.clear()
-        self.table.title = 'Internet Gateway'
-        self.table.field_names = ['Name']
-        self.table.add_row([igw])
-
-        print(self.table)
+        self.write('Internet Gateway', ['Name'], [[igw]])
 
     def print_nat(
             self,
             nat=None,
     ):
-        self.table.clear()
-        self.table.title = 'NAT Gateways'
-        self.table.field_names = ['Name', 'Elastic IP', 'Subnet']
-
-        if nat:
-            for nat_gw in nat:
-                self.table.add_row([nat_gw['name'], nat_gw['eip'], nat_gw['subnet']])
-        else:
-            self.table.add_row(['None', 'None', 'None'])
-
-        print(self.table)
+        rows = [[nat_gw['name'], nat_gw['eip'], nat_gw['subnet']] for nat_gw in nat] if nat else [[None, None, None]]
+        self.write('NAT Gateways', ['Name', 'Elastic IP', 'Subnet'], rows)
 
     def print_ep(
             self,
             s3_gateway_ep=None,
             dynamodb_gateway_ep=None
     ):
-        self.table.clear()
-        self.table.title = 'Gateway Endpoints'
-        self.table.field_names = ['Type', 'Route Table']
-
-        if s3_gateway_ep and s3_gateway_ep.get('route-table'):
-            self.table.add_row(['S3', '\n'.join(s3_gateway_ep['route-table'])])
-            # for route_table in s3_gateway_ep['route-table']:
-            #     self.table.add_row([route_table])
-        else:
-            self.table.add_row(['S3', 'None'])
-
-        if dynamodb_gateway_ep and dynamodb_gateway_ep.get('route-table'):
-            self.table.add_row(['DynamoDB', '\n'.join(dynamodb_gateway_ep['route-table'])])
-            # for route_table in s3_gateway_ep['route-table']:
-            #     self.table.add_row([route_table])
-        else:
-            self.table.add_row(['DynamoDB', 'None'])
-
-        print(self.table)
+        rows = [
+            ['S3', (s3_gateway_ep or {}).get('route-table') or None],
+            ['DynamoDB', (dynamodb_gateway_ep or {}).get('route-table') or None],
+        ]
+        self.write('Gateway Endpoints', ['Type', 'Route Table'], rows)
 
     def print_flow_logs(self, flow_logs=None):
         if flow_logs is None:
             flow_logs = {'log-group': '', 'role-name': ''}
-        self.table.clear()
-        self.table.title = 'VPC Flow Logs'
-        self.table.field_names = ['Log Group Name', 'Role Name']
 
-        self.table.add_row([flow_logs.get('log-group'), flow_logs.get('role-name')])
+        self.write('VPC Flow Logs', ['Log Group Name', 'Role Name'],
+                   [[flow_logs.get('log-group'), flow_logs.get('role-name')]])
+
+    def print_capacity(self, plan, subnets=False):
+        # plan is capacity.CapacityPlan, usable ips exclude the 5 addresses aws reserves in every subnet
+        if subnets:
+            self.write('Subnet Capacity', ['VPC', 'Tier', 'AZ', 'Name', 'CIDR', 'IPs', 'Usable IPs'],
+                       plan.get_subnet_rows())
 
-        print(self.table)
+        self.write('Tier Capacity', ['VPC', 'Tier', 'Subnets', 'IPs', 'Usable IPs'], plan.get_tier_rows())
+        self.write('AZ Capacity', ['VPC', 'AZ', 'Subnets', 'IPs', 'Usable IPs'], plan.get_az_rows())
+        self.write('VPC Capacity', ['VPC', 'CIDR', 'IPs', 'Subnets', 'Allocated IPs', 'Usable IPs', 'Free IPs',
+                                    'Used (%)'], plan.get_vpc_rows())
@@ -0,0 +1,36 @@
+class ResourceGraph:
+    # template resources keyed by logical id, with an index of (kind, human name) -> logical id
+    resources = None
+    names = None
+    kinds = None
+
+    def __init__(self):
+        self.resources = {}
+        self.names = {}
+        self.kinds = {}
+
+    def __contains__(self, logical_id):
+        return logical_id in self.resources
+
+    def __getitem__(self, logical_id):
+        return self.resources[logical_id]
+
+    def add(self, logical_id, resource, kind=None, name=None):
+        self.resources[logical_id] = resource
+
+        if kind:
+            self.kinds.setdefault(kind, []).append(logical_id)
+
+            if name is not None:
+                self.names[(kind, name)] = logical_id
+
+        return resource
+
+    def get_id(self, kind, name):
+        return self.names[(kind, name)]
+
+    def find_id(self, kind, name):
+        return self.names.get((kind, name))
+
+    def ids(self, kind):
+        return self.kinds.get(kind, [])
@@ -0,0 +1,95 @@
+import sys
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from vpc_cli.aws import aws_clients
+from vpc_cli.print_table import PrintTable, get_table
+
+MAX_WORKERS = 8
+DONE = object()  # marks the last page of a stack
+
+
+def list_resources(client, stack_name):
+    # every resource of the stack, pages of list_stack_resources are fetched as they are consumed
+    for page in client.get_paginator('list_stack_resources').paginate(StackName=stack_name):
+        yield from page['StackResourceSummaries']
+
+
+def parse_stacks(stacks, region=None):
+    # [region/]stack-name, stack names can not contain /
+    parsed = []
+
+    for stack in stacks:
+        stack_region, _, name = stack.rpartition('/')
+
+        if not (stack_region or region):
+            raise ValueError(f'{stack}: region is required')
+
+        parsed.append((stack_region or region, name))
+
+    return parsed
+
+
+def fetch_pages(client, region, name, results):
+    try:
+        for page in client.get_paginator('list_stack_resources').paginate(StackName=name):
+            results.put((region, name, page['StackResourceSummaries']))
+
+    except (BotoCoreError, ClientError) as e:
+        results.put((region, name, e))
+
+    finally:
+        results.put((region, name, DONE))
+
+
+def stream_resources(stacks, profile='default', max_workers=MAX_WORKERS):
+    # (region, stack name, resources of one page or error) of every stack at once, in the order pages arrive
+    results = queue.Queue()
+    clients = {region: aws_clients.get_client('cloudformation', profile, region) for region, _ in stacks}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for region, name in stacks:
+            executor.submit(fetch_pages, clients[region], region, name, results)
+
+        remaining = len(stacks)
+
+        while remaining:
+            region, name, page = results.get()
+
+            if page is DONE:
+                remaining -= 1
+                continue
+
+            yield region, name, page
+
+
+def get_rows(pages, errors):
+    for region, name, page in pages:
+        if isinstance(page, Exception):
+            errors.append(f'{region}/{name}: {page}')
+            continue
+
+        for resource in page:
+            yield [f'{region}/{name}', resource['LogicalResourceId'], resource.get('PhysicalResourceId'),
+                   resource['ResourceType'], resource['ResourceStatus']]
+
+
+def print_resources(stacks, profile='default', max_workers=MAX_WORKERS, table_format='table', stream=None):
+    # returns the number of stacks which could not be listed
+    field_names = ['Stack', 'Logical ID', 'Physical ID', 'Type', 'Status']
+    table = get_table('Resources', field_names)
+    table.align = 'l'
+    table.sortby = 'Stack'
+    table.sort_key = lambda row: (row[0], row[4], row[2])  # sort field first, then stack, type, logical id
+    errors = []
+
+    with PrintTable(table_format, stream) as print_table:
+        print_table.write('Resources', field_names, get_rows(stream_resources(stacks, profile, max_workers), errors),
+                          table)
+
+    for error in errors:
+        print(error, file=sys.stderr)
+
+    return len(errors)
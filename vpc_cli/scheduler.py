@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from vpc_cli.aws import aws_clients
+from vpc_cli.nested import template_source
+from vpc_cli.print_table import PrintTable, get_table
+from vpc_cli.spec import SpecError
+from vpc_cli.stack_names import stack_names
+from vpc_cli.template_cache import UNCHANGED_STATUS, is_deployed
+from vpc_cli.tools import bright_red, bright_green, bright_cyan
+from vpc_cli.tracker import StackTracker, COMPLETE_STATUS, FAILED_STATUS
+
+SUCCESS_STATUS = COMPLETE_STATUS + [UNCHANGED_STATUS]
+
+
+class RateLimiter:
+    # token bucket shared by every client of a region
+    rate = None
+    burst = None
+    tokens = None
+    updated = None
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, **kwargs):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class StatusBoard:
+    # combined status of every stack, one line per change
+    stacks = None
+    table_format = 'table'
+
+    def __init__(self, deployments, table_format='table'):
+        self.stacks = {d['key']: {'status': 'PENDING', 'start': None, 'end': None} for d in deployments}
+        self.table_format = table_format
+        # progress goes to stderr when the summary on stdout is read by other tools
+        self.stream = sys.stdout if table_format == 'table' else sys.stderr
+        self.lock = threading.Lock()
+
+    def update(self, key, status, reason=''):
+        with self.lock:
+            stack = self.stacks[key]
+
+            if stack['status'] == status:
+                return
+
+            now = time.monotonic()
+            stack['start'] = stack['start'] or now
+            stack['status'] = status
+
+            if status in SUCCESS_STATUS:
+                stack['end'] = now
+                color = bright_green
+
+            elif status in FAILED_STATUS or status == 'ERROR':
+                stack['end'] = now
+                color = bright_red
+
+            else:
+                color = bright_cyan
+
+            done = sum(1 for d in self.stacks.values() if d['end'])
+            print(f'[{done}/{len(self.stacks)}] {key:<50} {color(status)} {reason}', file=self.stream)
+
+    def get_rows(self, color=False):
+        for key, stack in self.stacks.items():
+            elapsed = stack['end'] - stack['start'] if stack['start'] and stack['end'] else 0
+            status = stack['status']
+
+            if color:
+                status = bright_green(status) if status in SUCCESS_STATUS else bright_red(status)
+
+            yield [key, status, round(elapsed)]
+
+    def print_summary(self):
+        field_names = ['Stack', 'Status', 'Time (s)']
+        table = get_table('Deployments', field_names)
+        table.align = 'l'
+
+        with PrintTable(self.table_format) as print_table:
+            print_table.write('Deployments', field_names, self.get_rows(self.table_format == 'table'), table)
+
+        return sum(1 for stack in self.stacks.values() if stack['status'] not in SUCCESS_STATUS)
+
+
+def load_deployments(path, profile='default'):
+    with open(path, 'r') as f:
+        try:
+            manifest = yaml.safe_load(f)
+
+        except yaml.YAMLError as e:
+            raise SpecError(e.__str__())
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get('stacks')
+
+    if not isinstance(manifest, list):
+        raise SpecError('manifest must be a list of stacks')
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    deployments = []
+    keys = set()
+
+    for i, entry in enumerate(manifest):
+        if not isinstance(entry, dict):
+            raise SpecError(f'stacks[{i}]: must be a mapping')
+
+        for field in ['template', 'stack-name', 'region']:
+            if not entry.get(field):
+                raise SpecError(f'stacks[{i}].{field}: is required')
+
+        deployment = {
+            'template': os.path.join(base_dir, entry['template']),
+            'name': entry['stack-name'],
+            'region': entry['region'],
+            'profile': entry.get('profile') or profile,
+            'project': entry.get('project') or entry['stack-name'],
+            'bucket': entry.get('bucket'),
+        }
+        deployment['key'] = f'{deployment["profile"]}/{deployment["region"]}/{deployment["name"]}'
+
+        if deployment['key'] in keys:
+            raise SpecError(f'stacks[{i}]: {deployment["key"]} is duplicated')
+
+        keys.add(deployment['key'])
+        deployments.append(deployment)
+
+    return deployments
+
+
+class DeployScheduler:
+    max_concurrency = 20
+    region_rate = 2
+    limiters = None
+    board = None
+
+    def __init__(self, deployments, max_concurrency=20, region_rate=2, table_format='table'):
+        self.deployments = deployments
+        self.max_concurrency = max_concurrency
+        self.region_rate = region_rate
+        self.limiters = {}
+        self.lock = threading.Lock()
+        self.board = StatusBoard(deployments, table_format)
+
+    def get_limiter(self, region):
+        with self.lock:
+            return self.limiters.setdefault(region, RateLimiter(self.region_rate))
+
+    def create_client(self, profile, region):
+        # clients are shared, the limiter of this scheduler is registered once per client
+        client = aws_clients.get_client('cloudformation', profile, region)
+        limiter = self.get_limiter(region)
+        client.meta.events.register('before-call', limiter.acquire, unique_id=f'rate-limiter-{id(limiter)}')
+
+        return client
+
+    def deploy(self, deployment):
+        key = deployment['key']
+
+        try:
+            with open(deployment['template'], 'r') as f:
+                template = f.read()
+
+            session = aws_clients.get_session(deployment['profile'], deployment['region'])
+            client = self.create_client(deployment['profile'], deployment['region'])
+
+            # existing complete stack with the same template is a no-op, no deployment is made
+            if deployment['name'] in stack_names.get(deployment['profile'], deployment['region']):
+                if is_deployed(client, deployment['name'], template):
+                    self.board.update(key, UNCHANGED_STATUS)
+                    return
+
+                raise ValueError('stack already exists with a different template or is not complete')
+
+            response = client.create_stack(
+                StackName=deployment['name'],
+                **template_source(session, template, deployment['bucket']),
+                TimeoutInMinutes=15,
+                Tags=[{'Key': 'Name', 'Value': deployment['name']}, {'Key': 'project', 'Value': deployment['project']}],
+                Capabilities=['CAPABILITY_NAMED_IAM'],
+            )
+            stack_names.add(deployment['profile'], deployment['region'], deployment['name'])
+            self.board.update(key, 'CREATE_IN_PROGRESS')
+
+            tracker = StackTracker(client, response['StackId'], on_status=lambda status: self.board.update(key, status))
+            tracker.wait()
+
+        except Exception as e:
+            self.board.update(key, 'ERROR', reason=e.__str__())
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            list(executor.map(self.deploy, self.deployments))
+
+        return self.board.print_summary()
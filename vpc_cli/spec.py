@@ -0,0 +1,250 @@
+import yaml
+
+from vpc_cli.allocator import SubnetAllocator, subnet_prefix
+from vpc_cli.cidr_index import CidrIndex
+from vpc_cli.tools import get_azs
+from vpc_cli.validators import name_validator, vpc_cidr_validator, subnet_cidr_validator
+
+SUBNET_TYPES = ['public', 'private', 'protected']
+
+
+class SpecError(ValueError):
+    pass
+
+
+def load_spec(path):
+    with open(path, 'r') as f:
+        try:
+            spec = yaml.safe_load(f)
+
+        except yaml.YAMLError as e:
+            raise SpecError(e.__str__())
+
+    if not isinstance(spec, dict):
+        raise SpecError('spec must be a mapping')
+
+    return spec
+
+
+def check_name(value, field):
+    if not isinstance(value, str) or not name_validator(value):
+        raise SpecError(f'{field}: name is required')
+
+    return value
+
+
+def check_mapping(value, field):
+    if not isinstance(value, dict):
+        raise SpecError(f'{field}: must be a mapping')
+
+    return value
+
+
+def check_list(value, field):
+    if not isinstance(value, list):
+        raise SpecError(f'{field}: must be a list')
+
+    return value
+
+
+def parse_spec(spec, profile=None):
+    project = check_name(spec.get('project'), 'project')
+    region = spec.get('region')
+
+    if not isinstance(region, str):
+        raise SpecError(f'region: unsupported region {region}')
+
+    try:
+        azs = get_azs(region, profile)
+    except KeyError:
+        raise SpecError(f'region: unsupported region {region}')
+
+    vpc = check_mapping(spec.get('vpc'), 'vpc')
+    vpc_name = check_name(vpc.get('name'), 'vpc.name')
+    vpc_cidr = vpc.get('cidr')
+
+    if not isinstance(vpc_cidr, str) or not vpc_cidr_validator(vpc_cidr):
+        raise SpecError(f'vpc.cidr: invalid CIDR {vpc_cidr}')
+
+    # subnets, validated in the same order as the interactive prompts
+    subnets = {subnet_type: [] for subnet_type in SUBNET_TYPES}
+    subnet_cidrs = CidrIndex()
+    subnet_names = set()
+    pending = []
+    spec_subnets = check_mapping(spec.get('subnets') or {}, 'subnets')
+
+    for subnet_type in SUBNET_TYPES:
+        for i, subnet in enumerate(check_list(spec_subnets.get(subnet_type) or [], f'subnets.{subnet_type}')):
+            field = f'subnets.{subnet_type}[{i}]'
+            check_mapping(subnet, field)
+            name = check_name(subnet.get('name'), f'{field}.name')
+
+            if name in subnet_names:
+                raise SpecError(f'{field}.name: duplicated subnet name {name}')
+
+            if subnet.get('az') not in azs:
+                raise SpecError(f'{field}.az: {subnet.get("az")} is not in {region}')
+
+            answer = {'name': name, 'cidr': subnet.get('cidr'), 'az': subnet['az']}
+            subnets[subnet_type].append(answer)
+            subnet_names.add(name)
+
+            # allocate cidr later from prefix or hosts when cidr is omitted
+            if subnet.get('cidr') is None and (subnet.get('prefix') or subnet.get('hosts')):
+                try:
+                    pending.append((answer, subnet_prefix(subnet)))
+
+                except ValueError as e:
+                    raise SpecError(f'{field}: {e}')
+
+                except TypeError:  # list or mapping
+                    raise SpecError(f'{field}: prefix or hosts must be a number')
+
+            elif not isinstance(subnet.get('cidr'), str) or \
+                    not subnet_cidr_validator(subnet['cidr'], vpc_cidr, subnet_cidrs):
+                raise SpecError(f'{field}.cidr: invalid or overlapped CIDR {subnet.get("cidr")}')
+
+            else:
+                subnet_cidrs.add(subnet['cidr'])
+
+    if pending:
+        allocator = SubnetAllocator(vpc_cidr, subnet_cidrs)
+
+        try:
+            cidrs = allocator.allocate_many([prefix for _, prefix in pending])
+
+        except ValueError as e:
+            raise SpecError(f'subnets: {e}')
+
+        for (answer, _), cidr in zip(pending, cidrs):
+            answer['cidr'] = cidr
+
+    public_subnet = subnets['public']
+    private_subnet = subnets['private']
+    protected_subnet = subnets['protected']
+    route_tables = check_mapping(spec.get('route-tables') or {}, 'route-tables')
+
+    # internet gateway only when public subnet exists
+    igw = None
+
+    if public_subnet:
+        igw = check_name(spec.get('igw'), 'igw')
+
+    # nat gateways only when public and private subnet exist
+    nat = []
+
+    if public_subnet and private_subnet:
+        public_subnet_names = {d['name'] for d in public_subnet}
+
+        for i, nat_gw in enumerate(check_list(spec.get('nat') or [], 'nat')):
+            field = f'nat[{i}]'
+            check_mapping(nat_gw, field)
+            check_name(nat_gw.get('name'), f'{field}.name')
+            check_name(nat_gw.get('eip'), f'{field}.eip')
+
+            if not isinstance(nat_gw.get('subnet'), str) or nat_gw['subnet'] not in public_subnet_names:
+                raise SpecError(f'{field}.subnet: {nat_gw.get("subnet")} is not a public subnet')
+
+            nat.append({'name': nat_gw['name'], 'eip': nat_gw['eip'], 'subnet': nat_gw['subnet']})
+
+    # route tables
+    public_rtb = None
+    private_rtb = []
+    protected_rtb = None
+
+    if public_subnet:
+        public_rtb = check_name(route_tables.get('public'), 'route-tables.public')
+
+    if private_subnet:
+        private_subnet_names = [d['name'] for d in private_subnet]
+        nat_names = {d['name'] for d in nat}
+        associated = set()
+
+        for i, rtb in enumerate(check_list(route_tables.get('private') or [], 'route-tables.private')):
+            field = f'route-tables.private[{i}]'
+            check_mapping(rtb, field)
+            name = check_name(rtb.get('name'), f'{field}.name')
+
+            if rtb.get('subnet') not in private_subnet_names:
+                raise SpecError(f'{field}.subnet: {rtb.get("subnet")} is not a private subnet')
+
+            if rtb['subnet'] in associated:
+                raise SpecError(f'{field}.subnet: {rtb["subnet"]} is already associated')
+
+            associated.add(rtb['subnet'])
+            answer = {'name': name, 'subnet': rtb['subnet']}
+
+            # choosing nat gateway only when public subnet exists
+            if public_subnet:
+                if not isinstance(rtb.get('nat'), str) or rtb['nat'] not in nat_names:
+                    raise SpecError(f'{field}.nat: {rtb.get("nat")} is not a NAT Gateway')
+
+                answer['nat'] = rtb['nat']
+
+            private_rtb.append(answer)
+
+        for subnet_name in private_subnet_names:
+            if subnet_name not in associated:
+                raise SpecError(f'route-tables.private: {subnet_name} has no route table')
+
+        used_nat_names = {rtb.get('nat') for rtb in private_rtb}
+
+        for nat_name in (d['name'] for d in nat):
+            if nat_name not in used_nat_names:
+                raise SpecError(f'nat: {nat_name} is not used by any private route table')
+
+    if protected_subnet:
+        protected_rtb = check_name(route_tables.get('protected'), 'route-tables.protected')
+
+    rtb_names = [public_rtb] if public_rtb else []
+    rtb_names.extend(d['name'] for d in private_rtb)
+    rtb_names.extend([protected_rtb] if protected_rtb else [])
+    rtb_name_set = set()
+
+    # resources are looked up by route table name, the same name twice would resolve to one of them
+    for name in rtb_names:
+        if name in rtb_name_set:
+            raise SpecError(f'route-tables: duplicated route table name {name}')
+
+        rtb_name_set.add(name)
+
+    # gateway endpoints
+    endpoints = check_mapping(spec.get('endpoints') or {}, 'endpoints')
+    gateway_ep = {}
+
+    for ep_type in ['s3', 'dynamodb']:
+        ep_rtbs = check_list(endpoints.get(ep_type) or [], f'endpoints.{ep_type}')
+
+        for rtb in ep_rtbs:
+            if not isinstance(rtb, str) or rtb not in rtb_name_set:
+                raise SpecError(f'endpoints.{ep_type}: {rtb} is not a route table')
+
+        gateway_ep[ep_type] = {'route-table': list(ep_rtbs)} if rtb_names else None
+
+    # flow logs
+    flow_logs = {'log-group': None, 'role-name': None}
+
+    if spec.get('flow-logs'):
+        spec_flow_logs = check_mapping(spec['flow-logs'], 'flow-logs')
+        flow_logs = {
+            'log-group': check_name(spec_flow_logs.get('log-group'), 'flow-logs.log-group'),
+            'role-name': check_name(spec_flow_logs.get('role-name'), 'flow-logs.role-name'),
+        }
+
+    return {
+        'project': project,
+        'region': region,
+        'vpc': {'name': vpc_name, 'cidr': vpc_cidr},
+        'public_subnet': public_subnet,
+        'private_subnet': private_subnet,
+        'protected_subnet': protected_subnet,
+        'k8s_tags': bool(spec.get('k8s-tags', False)) if public_subnet or private_subnet else False,
+        'igw': igw,
+        'public_rtb': public_rtb,
+        'private_rtb': private_rtb,
+        'protected_rtb': protected_rtb,
+        'nat': nat,
+        's3_gateway_ep': gateway_ep['s3'],
+        'dynamodb_gateway_ep': gateway_ep['dynamodb'],
+        'flow_logs': flow_logs,
+    }
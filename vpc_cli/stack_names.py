@@ -0,0 +1,78 @@
+import time
+import threading
+
+from vpc_cli.aws import aws_clients
+
+STACK_NAMES_TTL = 300
+
+# every status except DELETE_COMPLETE, deleted stack names can be reused
+ACTIVE_STACK_STATUS = [
+    'CREATE_IN_PROGRESS', 'CREATE_FAILED', 'CREATE_COMPLETE',
+    'ROLLBACK_IN_PROGRESS', 'ROLLBACK_FAILED', 'ROLLBACK_COMPLETE',
+    'DELETE_IN_PROGRESS', 'DELETE_FAILED',
+    'UPDATE_IN_PROGRESS', 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS', 'UPDATE_COMPLETE', 'UPDATE_FAILED',
+    'UPDATE_ROLLBACK_IN_PROGRESS', 'UPDATE_ROLLBACK_FAILED', 'UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS',
+    'UPDATE_ROLLBACK_COMPLETE', 'REVIEW_IN_PROGRESS',
+    'IMPORT_IN_PROGRESS', 'IMPORT_COMPLETE', 'IMPORT_ROLLBACK_IN_PROGRESS', 'IMPORT_ROLLBACK_FAILED',
+    'IMPORT_ROLLBACK_COMPLETE',
+]
+
+
+class StackNameCache:
+    ttl = STACK_NAMES_TTL
+    entries = None
+    locks = None
+    lock = None
+
+    def __init__(self, ttl=STACK_NAMES_TTL):
+        self.ttl = ttl
+        self.entries = {}  # (profile, region) -> (expires at, stack names)
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def list_stack_names(self, profile, region):
+        client = aws_clients.get_client('cloudformation', profile, region)
+        names = set()
+
+        for page in client.get_paginator('list_stacks').paginate(StackStatusFilter=ACTIVE_STACK_STATUS):
+            names.update(summary['StackName'] for summary in page['StackSummaries'])
+
+        return names
+
+    def get(self, profile, region):
+        key = (profile, region)
+
+        with self.lock:
+            lock = self.locks.setdefault(key, threading.Lock())
+
+        # concurrent callers wait for the running fetch instead of fetching again
+        with lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                entry = (time.monotonic() + self.ttl, self.list_stack_names(profile, region))
+                self.entries[key] = entry
+
+            return entry[1]
+
+    def prefetch(self, profile, region):
+        def fetch():
+            try:
+                self.get(profile, region)
+
+            except Exception:  # raised again when validator calls get
+                pass
+
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def add(self, profile, region, name):
+        entry = self.entries.get((profile, region))
+
+        if entry:
+            entry[1].add(name)
+
+    def invalidate(self, profile, region):
+        self.entries.pop((profile, region), None)
+
+
+stack_names = StackNameCache()
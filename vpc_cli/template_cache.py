@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+
+from vpc_cli import VERSION
+
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.vpc-cli', 'templates')
+UNCHANGED_STATUS = 'UNCHANGED'
+# stacks which can be skipped when their template is unchanged, rolled back or failed stacks are deployed again
+COMPLETE_STATUS = ['CREATE_COMPLETE', 'UPDATE_COMPLETE', 'IMPORT_COMPLETE']
+# modules templates are built from, vpc_cli/<name>.py
+GENERATOR_MODULES = ['allocator', 'builder', 'cidr_index', 'create_yaml', 'resource_graph', 'spec', 'tools',
+                     'validators']
+
+
+def sha256(value):
+    # canonical json, so key order and yaml formatting do not change the hash
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode()).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def get_generator_hash():
+    # source of the generator, so local edits and dev installs without a version bump never read stale templates
+    digest = hashlib.sha256()
+
+    for name in GENERATOR_MODULES:
+        with open(os.path.join(os.path.dirname(__file__), f'{name}.py'), 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def get_key(spec, output_format='yaml'):
+    # templates of the same spec differ between versions of the generator
+    return sha256({'spec': spec, 'format': output_format, 'version': VERSION, 'generator': get_generator_hash()})
+
+
+def template_hash(body):
+    # body is template text (yaml or json) or already parsed template, e.g. json body of get_template
+    if isinstance(body, str):
+        import yaml
+
+        from vpc_cli.check import TemplateLoader
+
+        body = yaml.load(body, Loader=TemplateLoader)
+
+    return sha256(body)
+
+
+class TemplateCache:
+    # emitted templates keyed by hash of the spec
+    path = TEMPLATE_CACHE_DIR
+    hits = 0
+    misses = 0
+
+    def __init__(self, path=TEMPLATE_CACHE_DIR):
+        self.path = path
+
+    def get_path(self, key, output_format='yaml'):
+        return os.path.join(self.path, key[:2], f'{key}.{output_format}')
+
+    def get(self, key, output_format='yaml'):
+        try:
+            with open(self.get_path(key, output_format)) as f:
+                body = f.read()
+
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return body
+
+    def put(self, key, body, output_format='yaml'):
+        # write to a temporary file and rename, concurrent fleet workers may write the same key
+        path = self.get_path(key, output_format)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(temp_path, 'w') as f:
+            f.write(body)
+
+        os.replace(temp_path, path)
+
+
+def check_body(body, region=None):
+    # errors of a cached template body, a body which can not be parsed is an error too
+    import yaml
+
+    from vpc_cli.check import TemplateLoader, check_template
+
+    try:
+        return check_template(yaml.load(body, Loader=TemplateLoader), region)
+
+    except yaml.YAMLError as e:
+        return [str(e)]
+
+
+def render_cached(spec, output_format='yaml', cache=None):
+    # (template body, whether it came from the cache), cache=None builds without the cache,
+    # raises SpecError of an invalid spec and ValueError of a template which fails the check
+    import io
+
+    from vpc_cli.check import check_template
+    from vpc_cli.create_yaml import CreateYAML, dump_template
+    from vpc_cli.spec import parse_spec
+
+    # the spec is validated even when its template is cached
+    options = parse_spec(spec)
+    key = get_key(spec, output_format)
+    body = cache.get(key, output_format) if cache else None
+
+    # cached templates are checked again, a template which fails is built again
+    if body is not None and not check_body(body, options['region']):
+        return body, True
+
+    template = CreateYAML(**options, output=None).get_template()
+    errors = check_template(template, options['region'])
+
+    if errors:
+        raise ValueError(', '.join(errors))
+
+    stream = io.StringIO()
+    dump_template(template, stream, output_format)
+    body = stream.getvalue()
+
+    if cache:
+        cache.put(key, body, output_format)
+
+    return body, False
+
+
+def get_stack_status(client, stack_name):
+    # status of the stack, None when there is no stack
+    from botocore.exceptions import ClientError
+
+    try:
+        response = client.describe_stacks(StackName=stack_name)
+
+    except ClientError as e:
+        if 'does not exist' in e.response.get('Error', {}).get('Message', ''):
+            return None
+
+        raise
+
+    return response['Stacks'][0]['StackStatus']
+
+
+def get_deployed_hash(client, stack_name):
+    # hash of the template the stack was created or last updated with, None when there is no stack
+    from botocore.exceptions import ClientError
+
+    try:
+        response = client.get_template(StackName=stack_name, TemplateStage='Original')
+
+    except ClientError as e:
+        if 'does not exist' in e.response.get('Error', {}).get('Message', ''):
+            return None
+
+        raise
+
+    return template_hash(response['TemplateBody'])
+
+
+def is_deployed(client, stack_name, body):
+    if get_stack_status(client, stack_name) not in COMPLETE_STATUS:
+        return False
+
+    return get_deployed_hash(client, stack_name) == template_hash(body)
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,94 @@
+import sys
+import time
+from functools import wraps
+from contextlib import contextmanager
+
+
+class Timings:
+    # wall time, call count and bytes written per phase, nothing is recorded until enabled
+    enabled = False
+    command = None
+    started = None
+    start = None
+    phases = None
+
+    def __init__(self):
+        self.phases = {}
+
+    def enable(self, command=None):
+        self.enabled = True
+        self.command = command or 'interactive'
+        self.started = time.time()
+        self.start = time.perf_counter()
+
+    def get_phase(self, name):
+        return self.phases.setdefault(name, {'wall': 0.0, 'calls': 0, 'bytes': 0})
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            phase = self.get_phase(name)
+            phase['wall'] += time.perf_counter() - start
+            phase['calls'] += 1
+
+    def add_bytes(self, name, size):
+        if self.enabled:
+            self.get_phase(name)['bytes'] += size
+
+    def add_calls(self, name, count=1):
+        if self.enabled:
+            self.get_phase(name)['calls'] += count
+
+    def get_report(self):
+        return {
+            'command': self.command,
+            'started': self.started,
+            'wall': time.perf_counter() - self.start,
+            'phases': [dict(phase=name, **phase) for name, phase in self.phases.items()],
+        }
+
+    def write(self, stream=None, output_format='json'):
+        import json
+
+        stream = stream or sys.stderr
+        report = self.get_report()
+
+        if output_format == 'ndjson':  # one record per phase, plus the whole run
+            for phase in report['phases']:
+                stream.write(json.dumps(dict(phase, command=report['command'], started=report['started'])) + '\n')
+
+            stream.write(json.dumps({
+                'phase': 'total', 'command': report['command'], 'started': report['started'], 'wall': report['wall']
+            }) + '\n')
+
+        else:
+            json.dump(report, stream, indent=2)
+            stream.write('\n')
+
+
+def timed(name):
+    # records every call of the decorated function as phase name
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not timings.enabled:
+                return func(*args, **kwargs)
+
+            with timings.phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+timings = Timings()
@@ -1,18 +1,63 @@
-import ipaddr
-from pyfiglet import Figlet
+from functools import lru_cache
+
+from vpc_cli.az_cache import az_cache
 
 
 def print_figlet():
+    from pyfiglet import Figlet
+
     figlet_title = Figlet(font='slant')
 
     print(figlet_title.renderText('VPC Stack Generator'))
 
 
+@lru_cache(maxsize=65536)
+def cidr_range(cidr):
+    # returns first and last address of cidr as integers, host bits are ignored like ipaddr.IPNetwork
+    address, _, prefix = cidr.partition('/')
+    octets = address.split('.')
+    prefix = int(prefix) if prefix else 32
+
+    if len(octets) != 4 or not 0 <= prefix <= 32:
+        raise ValueError(f'invalid CIDR {cidr}')
+
+    value = 0
+
+    for octet in octets:
+        octet = int(octet)
+
+        if not 0 <= octet <= 255:
+            raise ValueError(f'invalid CIDR {cidr}')
+
+        value = value << 8 | octet
+
+    size = 1 << (32 - prefix)
+    first = value & ~(size - 1)
+
+    return first, first + size - 1
+
+
 def cidr_overlapped(cidr1, cidr2):
-    return ipaddr.IPNetwork(cidr1).overlaps(ipaddr.IPNetwork(cidr2))
+    first1, last1 = cidr_range(cidr1)
+    first2, last2 = cidr_range(cidr2)
+
+    return first1 <= last2 and first2 <= last1
+
+
+def cidr_contains(cidr1, cidr2):
+    first1, last1 = cidr_range(cidr1)
+    first2, last2 = cidr_range(cidr2)
+
+    return first1 <= first2 and last2 <= last1
+
+
+def get_azs(region, profile=None):
+    # discovered azs from the local cache, the list below is used until the cache is filled
+    azs = az_cache.get_azs(region, profile)
 
+    if azs:
+        return azs
 
-def get_azs(region):
     az_lists = {
         'us-east-1': [
             'us-east-1a',
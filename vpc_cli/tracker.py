@@ -0,0 +1,117 @@
+import time
+
+from botocore.exceptions import ClientError
+
+COMPLETE_STATUS = ['CREATE_COMPLETE', 'UPDATE_COMPLETE', 'IMPORT_COMPLETE']
+FAILED_STATUS = [
+    'CREATE_FAILED', 'ROLLBACK_FAILED', 'ROLLBACK_COMPLETE',
+    'DELETE_FAILED', 'DELETE_COMPLETE',
+    'UPDATE_FAILED', 'UPDATE_ROLLBACK_FAILED', 'UPDATE_ROLLBACK_COMPLETE',
+    'IMPORT_ROLLBACK_FAILED', 'IMPORT_ROLLBACK_COMPLETE',
+]
+THROTTLING_ERRORS = ['Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException']
+
+
+class StackTracker:
+    # tails describe_stack_events from the last seen event and backs off while the stack is quiet
+    client = None
+    stack_name = None
+    last_event_id = None
+    status = None
+    min_delay = 2
+    max_delay = 30
+    backoff = 1.5
+    api_calls = 0
+
+    def __init__(
+            self,
+            client,
+            stack_name,
+            on_event=None,
+            on_status=None,
+            min_delay=2,
+            max_delay=30,
+            backoff=1.5,
+            sleep=time.sleep
+    ):
+        self.client = client
+        self.stack_name = stack_name
+        self.on_event = on_event
+        self.on_status = on_status
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.sleep = sleep
+
+    def fetch_new_events(self):
+        # events are returned newest first, stop paging at the watermark
+        events = []
+        kwargs = {'StackName': self.stack_name}
+
+        while True:
+            self.api_calls += 1
+            response = self.client.describe_stack_events(**kwargs)
+
+            for event in response['StackEvents']:
+                if event['EventId'] == self.last_event_id:
+                    return events[::-1]
+
+                events.append(event)
+
+            if not response.get('NextToken'):
+                return events[::-1]
+
+            kwargs['NextToken'] = response['NextToken']
+
+    def mark(self):
+        # skip events which already exist, e.g. before updating a stack
+        self.api_calls += 1
+        events = self.client.describe_stack_events(StackName=self.stack_name)['StackEvents']
+        self.last_event_id = events[0]['EventId'] if events else None
+
+    def poll(self):
+        events = self.fetch_new_events()
+
+        for event in events:
+            self.last_event_id = event['EventId']
+
+            if self.on_event:
+                self.on_event(event)
+
+            # stack level event, nested stacks have their own physical id
+            if event['ResourceType'] == 'AWS::CloudFormation::Stack' and \
+                    event['PhysicalResourceId'] == event['StackId']:
+                self.status = event['ResourceStatus']
+
+                if self.on_status:
+                    self.on_status(self.status)
+
+        return events
+
+    def is_done(self):
+        return self.status in COMPLETE_STATUS or self.status in FAILED_STATUS
+
+    def wait(self):
+        delay = self.min_delay
+
+        while True:
+            try:
+                events = self.poll()
+
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLING_ERRORS:
+                    raise
+
+                events = None
+                delay = min(delay * 2, self.max_delay)
+
+            if self.is_done():
+                return self.status
+
+            if events:
+                delay = self.min_delay
+
+            elif events is not None:
+                delay = min(delay * self.backoff, self.max_delay)
+
+            self.sleep(delay)
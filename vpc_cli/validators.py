@@ -1,23 +1,35 @@
 import re
-import boto3
-from botocore.exceptions import ClientError, ProfileNotFound
-from inquirer.errors import ValidationError
-from vpc_cli.tools import cidr_overlapped
+from vpc_cli.cidr_index import CidrIndex
+from vpc_cli.timings import timed
+from vpc_cli.tools import cidr_contains, cidr_overlapped, cidr_range
 
 
 def name_validator(text):
     return len(text) > 0
 
 
+@timed('validate.vpc_cidr')
 def vpc_cidr_validator(text):
-    return re.match(pattern=r'(?<!\d\.)(?<!\d)(?:\d{1,3}\.){3}\d{1,3}/\d{1,2}(?!\d|(?:\.\d))',
-                    string=text)
+    re_match = re.match(pattern=r'(?<!\d\.)(?<!\d)(?:\d{1,3}\.){3}\d{1,3}/\d{1,2}(?!\d|(?:\.\d))',
+                        string=text)
+
+    if not re_match:
+        return False
+
+    try:
+        cidr_range(text)
+
+    except ValueError:  # octet or prefix out of range
+        return False
+
+    return True
 
 
 def subnet_count_validator(text):
     return re.match(pattern=r'^[0-9]{1,}$', string=text)
 
 
+@timed('validate.subnet_cidr')
 def subnet_cidr_validator(text, vpc_cidr, subnet_cidrs):
     re_match = re.match(pattern=r'(?<!\d\.)(?<!\d)(?:\d{1,3}\.){3}\d{1,3}/\d{1,2}(?!\d|(?:\.\d))',
                         string=text)
@@ -25,32 +37,41 @@ def subnet_cidr_validator(text, vpc_cidr, subnet_cidrs):
     if not re_match:
         return False
 
-    elif not cidr_overlapped(vpc_cidr, text):
+    try:
+        if not cidr_contains(vpc_cidr, text):
+            return False
+
+    except ValueError:  # octet or prefix out of range
         return False
 
-    else:
-        for subnet_cidr in subnet_cidrs:
-            if cidr_overlapped(subnet_cidr, text):
-                return False
+    # callers validating many subnets pass a CidrIndex, other iterables are scanned once per call,
+    # which also accepts existing subnets which already overlap
+    if not isinstance(subnet_cidrs, CidrIndex):
+        return not any(cidr_overlapped(subnet_cidr, text) for subnet_cidr in subnet_cidrs)
 
-        return True
+    return not subnet_cidrs.overlaps(text)
 
 
+@timed('validate.stack_name')
 def stack_name_validator(text, region, profile='default'):
     if not len(text):
         return False
 
+    elif not re.match(pattern=r'^[a-zA-Z][-a-zA-Z0-9]{0,127}$', string=text):
+        return False
+
     else:
+        # only prompts need these, spec validation doesn't pay for the imports
+        from botocore.exceptions import ProfileNotFound
+        from inquirer.errors import ValidationError
+        from vpc_cli.stack_names import stack_names
+
         try:
-            boto3.session.Session(profile_name=profile, region_name=region).client('cloudformation') \
-                .describe_stacks(StackName=text)
+            return text not in stack_names.get(profile, region)
 
         except ProfileNotFound as e:
             raise ValidationError('', reason=e.__str__())
 
-        except ClientError:  # stack doest
-            return True
-
         except Exception as e:
             print(e)
 